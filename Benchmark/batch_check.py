@@ -0,0 +1,62 @@
+from __future__ import division
+import random as rd
+import sys
+import time
+import numpy as np
+from IA.batch_mcts import *
+from Benchmark.common import *
+
+NB_POSITIONS = 6
+NB_ROLLOUTS = 200
+# Largest difference allowed between the mean rewards of the playouts, in standard errors
+MAX_ERRORS = 4.0
+
+
+def check_rejected(game, **options):
+    """
+    Checks that a Batch_Mcts refuses a game or options its playouts would not follow
+    :param game: (Solitaire_Engine) the game
+    :param options: (dict) parameters of the Batch_Mcts
+    """
+    try:
+        Batch_Mcts(game, **options)
+    except ValueError:
+        return
+    raise AssertionError("Batch_Mcts accepts " + (str(options) if options else "an auto_heap game"))
+
+
+def check_playouts(solitaire, nb_rollouts, seed):
+    """
+    Checks that the playouts of a batch have the mean reward of the playouts of Mcts_Stocha
+    :param solitaire: (Solitaire_Engine) starting position of the playouts
+    :param nb_rollouts: (int) number of playouts of each kind
+    :param seed: (int) seed of the playouts
+    :return: the difference between the mean rewards, in standard errors
+    """
+    mcts = Mcts_Stocha(solitaire, seed=seed)
+    scalar = np.array([mcts.simulation(solitaire) for i in range(nb_rollouts)])
+    batch = Batch_Engine(solitaire, nb_rollouts, np.random.default_rng(seed)).rollouts(GAMMA, FACTOR_THRESHOLD)
+    error = np.sqrt(scalar.var() / len(scalar) + batch.var() / len(batch))
+    if error == 0: return 0.0
+    return abs(scalar.mean() - batch.mean()) / error
+
+
+if __name__ == '__main__':
+    nb_positions = int(sys.argv[1]) if len(sys.argv) > 1 else NB_POSITIONS
+    start = time.perf_counter()
+    check_rejected(Solitaire_Engine(0, auto_heap=True))
+    check_rejected(Solitaire_Engine(0), rollout_policy=Heuristic_Policy())
+    # A uniform policy is refused too, the batches never draw through a policy
+    check_rejected(Solitaire_Engine(0), rollout_policy=Uniform_Policy())
+
+    rng = rd.Random(0)
+    # One position of each deal, reached by a random number of random actions
+    positions = [collect_positions([seed], rng.randint(1, 20), rng)[-1] for seed in range(nb_positions)]
+    worst = 0.0
+    for i, solitaire in enumerate(positions):
+        errors = check_playouts(solitaire, NB_ROLLOUTS, i)
+        assert errors <= MAX_ERRORS, "the playouts of position " + str(i) + " differ by " + \
+                                     str(round(errors, 1)) + " standard errors"
+        worst = max(worst, errors)
+    print("batch_check: " + str(len(positions)) + " positions - largest difference " + str(round(worst, 1)) +
+          " standard errors - " + str(round(time.perf_counter() - start, 1)) + " s")
@@ -0,0 +1,21 @@
+import copy
+import random as rd
+from Game.solitaire_engine import *
+
+
+def collect_positions(seeds, nb_positions, rng=rd):
+    """
+    Plays random actions from deals and collects the positions met along the way
+    :param seeds: (list (int)) seeds of the deals, None for a deal drawn from the global generator
+    :param nb_positions: (int) maximum number of positions collected in each deal
+    :param rng: (random.Random) generator of the random actions, the global one by default
+    :return: the list of collected games, none of them over
+    """
+    positions = []
+    for seed in seeds:
+        solitaire = Solitaire_Engine(seed)
+        for i in range(nb_positions):
+            if solitaire.is_over(): break
+            positions.append(copy.deepcopy(solitaire))
+            solitaire.play(rng.choice(sorted(solitaire.actions_dict)))
+    return positions
@@ -0,0 +1,32 @@
+from __future__ import division
+import random as rd
+import sys
+import time
+from Game.solitaire_engine import *
+from Benchmark.common import *
+
+NB_GAMES = 20
+MAX_TURNS = 100
+NB_REPEATS = 20
+
+
+def benchmark(positions, nb_repeats):
+    """
+    Measures the number of legal_actions calls per second over a set of positions
+    :param positions: (list (Solitaire_Engine)) positions to evaluate
+    :param nb_repeats: (int) number of evaluations of each position
+    """
+    start = time.perf_counter()
+    for i in range(nb_repeats):
+        for solitaire in positions:
+            solitaire.legal_actions()
+    elapsed = time.perf_counter() - start
+    return nb_repeats * len(positions) / elapsed
+
+
+if __name__ == '__main__':
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    rd.seed(seed)
+    positions = collect_positions([None] * NB_GAMES, MAX_TURNS)
+    calls = benchmark(positions, NB_REPEATS)
+    print("legal_actions: " + str(len(positions)) + " positions - " + str(int(calls)) + " calls/s")
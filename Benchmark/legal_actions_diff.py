@@ -0,0 +1,455 @@
+from __future__ import division
+import random as rd
+import sys
+import time
+import copy
+from Game.solitaire_engine import *
+from Game.compact_engine import *
+
+NB_GAMES = 200
+MAX_TURNS = 200
+
+
+class Reference_Column:
+    """
+    Column of a Reference_Engine, as the Column class was before this series
+    """
+
+    def __init__(self, number):
+        self.nb_todraw = number+1
+        self.cards = []
+
+    def need_reveal(self):
+        return (not self.cards) and (self.nb_todraw > 0)
+
+    def same_color(self, card1, card2):
+        if (card1.color in REDS and card2.color in REDS): return True
+        if (card1.color in BLACKS and card2.color in BLACKS): return True
+
+        return False
+
+    def can_add(self, card):
+        if not self.cards:
+            if card.rank == KING: return True
+            else : return False
+
+        top_card = self.cards[-1]
+        if card.rank != top_card.rank-1: return False
+        if self.same_color(top_card, card): return False
+
+        return True
+
+    def can_remove(self, number):
+        return len(self.cards) >= number
+
+    def add_cards(self, cards):
+        for card in cards:
+            self.cards.append(card)
+
+    def reveal_card(self, card):
+        self.nb_todraw -= 1
+        self.add_cards([card])
+
+    def remove_cards(self, number):
+        cards = []
+        for i in range(number):
+            cards.append(self.cards.pop())
+        cards.reverse()
+
+        return cards
+
+
+class Reference_Heap:
+    """
+    Heap of a Reference_Engine, as the Heap class was before this series
+    """
+
+    def __init__(self):
+        self.cards = []
+
+    def can_add(self, card):
+        if not self.cards:
+            if card.rank == ACE: return True
+            else: return False
+
+        top_card = self.cards[-1]
+        if card.rank != top_card.rank+1: return False
+        if card.color != top_card.color: return False
+
+        return True
+
+    def can_remove(self):
+        return len(self.cards) > 0
+
+    def add_card(self, card):
+        self.cards.append(card)
+
+    def remove_card(self):
+        return self.cards.pop()
+
+
+class Reference_Engine:
+    """
+    Class playing a game the way the engine did before this series: every legal action is checked
+    on a deep copy of the game, and the states reached by the moves from a heap or between columns
+    are compared with the list of the state strings met. Its columns and heaps are copies of the
+    classes before this series, only the Card class, unchanged since, is shared with the engine,
+    and the revealed cards are given instead of drawn.
+    """
+
+    def __init__(self, game):
+        """
+        Creates a new Reference_Engine object
+        :param game: (Solitaire_Engine) the newly dealt game to play, left unchanged
+        """
+        self.state_dict = dict()
+        for i in range(33):
+            if i <= 6:
+                self.state_dict[IN_COL + str(i)] = i
+            elif i == 7:
+                self.state_dict[IN_HEAP] = i
+            elif i == 8:
+                self.state_dict[UNDRAWN] = i
+            else:
+                self.state_dict[IN_DECK + str(i-9)] = i
+        self.cards_state = dict()
+        # Face-down cards of the columns
+        self.hidden = list(game.main_deck.cards)
+        self.sub_deck = []
+        self.sub_deck_index = []
+        for i in range(NB_CARDS_SUBDECK):
+            card = game.sub_deck[i]
+            self.cards_state[(card.rank, card.color)] = self.state_dict[IN_DECK + str(i)]
+            self.sub_deck.append(card)
+        self.heaps = []
+        for i in range(NB_HEAPS):
+            self.heaps.append(Reference_Heap())
+        self.columns = []
+        for i in range(NB_COLUMNS):
+            self.columns.append(Reference_Column(i))
+            card = game.columns[i].cards[0]
+            self.cards_state[(card.rank, card.color)] = self.state_dict[IN_COL + str(i)]
+            self.columns[i].reveal_card(card)
+        self.reward = 0
+        self.time = 0
+        self.score = 0
+        _, state = self.get_state()
+        self.states_stack = [state]
+        self.actions_dict = dict()
+        self.legal_actions()
+
+    def reveal(self, col, reveal):
+        """
+        Reveals a face-down card in a column
+        :param col: (int) index of the column
+        :param reveal: ((int, string)) rank and color of the card to reveal, any face-down card if None
+        """
+        card = self.hidden[0]
+        if reveal is not None:
+            card = [card for card in self.hidden if (card.rank, card.color) == reveal][0]
+        self.hidden.remove(card)
+        self.cards_state[(card.rank, card.color)] = self.state_dict[IN_COL + str(col)]
+        self.columns[col].reveal_card(card)
+        self.reward += 5
+
+    def can_draw(self):
+        return len(self.sub_deck) > 0
+
+    def draw(self):
+        if not self.can_draw(): return False
+
+        if not self.sub_deck_index:
+            self.sub_deck_index = [i for i in range(min(3, len(self.sub_deck)))]
+        else:
+            start = self.sub_deck_index[-1] + 1
+            if start >= len(self.sub_deck):
+                self.sub_deck_index = [i for i in range(min(3, len(self.sub_deck)))]
+            else:
+                end = min(start+3, len(self.sub_deck))
+                self.sub_deck_index = [i for i in range(start, end)]
+
+        self.reward = 0
+
+    def can_deck_to_heap(self, heap, nb_draw):
+        game_copy = copy.deepcopy(self)
+        if not game_copy.can_draw(): return False
+        for i in range(nb_draw):
+            game_copy.draw()
+
+        if not game_copy.sub_deck_index: return False
+
+        card = game_copy.sub_deck[game_copy.sub_deck_index[-1]]
+        return game_copy.heaps[heap].can_add(card)
+
+    def deck_to_heap(self, heap, nb_draw):
+        if not self.can_deck_to_heap(heap, nb_draw): return False
+
+        for i in range(nb_draw):
+            self.draw()
+
+        index_heap = self.sub_deck_index.pop()
+        card = self.sub_deck.pop(index_heap)
+        self.heaps[heap].add_card(card)
+
+        self.cards_state[(card.rank, card.color)] = self.state_dict[IN_HEAP]
+        while index_heap < len(self.sub_deck):
+            card = self.sub_deck[index_heap]
+            self.cards_state[(card.rank, card.color)] = self.state_dict[IN_DECK + str(index_heap)]
+            index_heap += 1
+
+        self.reward = 10
+
+    def can_deck_to_column(self, col, nb_draw):
+        game_copy = copy.deepcopy(self)
+        if not game_copy.can_draw(): return False
+        for i in range(nb_draw):
+            game_copy.draw()
+
+        if not game_copy.sub_deck_index: return False
+
+        card = game_copy.sub_deck[game_copy.sub_deck_index[-1]]
+        return game_copy.columns[col].can_add(card)
+
+    def deck_to_column(self, col, nb_draw):
+        if not self.can_deck_to_column(col, nb_draw): return
+        for i in range(nb_draw):
+            self.draw()
+
+        index_heap = self.sub_deck_index.pop()
+        card = self.sub_deck.pop(index_heap)
+        self.columns[col].add_cards([card])
+
+        self.cards_state[(card.rank, card.color)] = self.state_dict[IN_COL + str(col)]
+        while index_heap < len(self.sub_deck):
+            card = self.sub_deck[index_heap]
+            self.cards_state[(card.rank, card.color)] = self.state_dict[IN_DECK + str(index_heap)]
+            index_heap += 1
+
+        self.reward = 5
+
+    def can_column_to_heap(self, col, heap):
+        if not self.columns[col].can_remove(1): return False
+
+        card = self.columns[col].cards[-1]
+        return self.heaps[heap].can_add(card)
+
+    def column_to_heap(self, col, heap, reveal=None):
+        column = self.columns[col]
+        if not self.can_column_to_heap(col, heap): return
+
+        cards = column.remove_cards(1)
+        self.heaps[heap].add_card(cards[0])
+        self.cards_state[(cards[0].rank, cards[0].color)] = self.state_dict[IN_HEAP]
+
+        self.reward = 10
+
+        if column.need_reveal(): self.reveal(col, reveal)
+
+    def can_heap_to_column(self, heap, col):
+        if not self.heaps[heap].can_remove(): return False
+
+        card = self.heaps[heap].cards[-1]
+        if card.rank == ACE: return False
+        return self.columns[col].can_add(card)
+
+    def heap_to_column(self, heap, col):
+        card = self.heaps[heap].remove_card()
+        self.columns[col].add_cards([card])
+        self.cards_state[(card.rank, card.color)] = self.state_dict[IN_COL + str(col)]
+
+        self.reward = -15
+
+    def can_column_to_column(self, col1, col2, nb_cards):
+        if not self.columns[col1].can_remove(nb_cards): return False
+
+        column_copy = copy.deepcopy(self.columns[col1])
+        cards = column_copy.remove_cards(nb_cards)
+        return self.columns[col2].can_add(cards[0])
+
+    def column_to_column(self, col1, col2, nb_cards, reveal=None):
+        column = self.columns[col1]
+        cards = column.remove_cards(nb_cards)
+        self.columns[col2].add_cards(cards)
+        for card in cards:
+            self.cards_state[(card.rank, card.color)] = self.state_dict[IN_COL + str(col2)]
+
+        self.reward = 0
+
+        if column.need_reveal(): self.reveal(col1, reveal)
+
+    def legal_actions(self):
+        """
+        Retrieves all the legal actions, as (opcode, arguments) pairs by key like the engine
+        """
+        index_action = 0
+        self.actions_dict.clear()
+        table = self.actions_dict
+
+        cards_list = []
+        nb_draw = 0
+        game_copy = copy.deepcopy(self)
+        if game_copy.sub_deck_index:
+            card = game_copy.sub_deck[game_copy.sub_deck_index[-1]]
+            cards_list.append(card)
+        if game_copy.sub_deck:
+            while True:
+                for heap in range(NB_HEAPS):
+                    if game_copy.can_deck_to_heap(heap, 0):
+                        table[index_action] = (DECK_HEAP, (heap, nb_draw))
+                    index_action += 1
+
+                for col in range(NB_COLUMNS):
+                    if game_copy.can_deck_to_column(col, 0):
+                        table[index_action] = (DECK_COL, (col, nb_draw))
+                    index_action += 1
+
+                game_copy.draw()
+                card = game_copy.sub_deck[game_copy.sub_deck_index[-1]]
+                if card in cards_list: break
+                cards_list.append(card)
+                nb_draw += 1
+
+        index_action = int(NB_CARDS_SUBDECK/3 +1) * NB_HEAPS + int(NB_CARDS_SUBDECK/3 +1) * NB_COLUMNS
+        for heap in range(NB_HEAPS):
+            for col1 in range(NB_COLUMNS):
+                if self.can_column_to_heap(col1, heap):
+                    table[index_action] = (COL_HEAP, (col1, heap))
+                index_action += 1
+
+        for heap in range(NB_HEAPS):
+            for col1 in range(NB_COLUMNS):
+                if self.can_heap_to_column(heap, col1):
+                    game_copy = copy.deepcopy(self)
+                    game_copy.heap_to_column(heap, col1)
+                    _, state = game_copy.get_state()
+                    if state not in self.states_stack:
+                        table[index_action] = (HEAP_COL, (heap, col1))
+                index_action += 1
+
+        for col1 in range(NB_COLUMNS):
+            for col2 in range(NB_COLUMNS):
+                if col1 != col2:
+                    max_cards = len(self.columns[col1].cards)
+                    max_nb_cards = -1
+                    # Choose action with the most cards
+                    for nb_cards in range(1, max_cards+1):
+                        if self.can_column_to_column(col1, col2, nb_cards):
+                            game_copy = copy.deepcopy(self)
+                            game_copy.column_to_column(col1, col2, nb_cards)
+                            _, state = game_copy.get_state()
+                            if state not in self.states_stack:
+                                max_nb_cards = nb_cards
+                    if max_nb_cards > -1:
+                        table[index_action] = (COL_COL, (col1, col2, max_nb_cards))
+                    index_action += 1
+
+        return list(self.actions_dict.keys())
+
+    def play(self, action, reveal=None):
+        """
+        Plays an action
+        :param action: (int) key of the action to play
+        :param reveal: ((int, string)) rank and color of the card to reveal, if any
+        """
+        opcode, args = self.actions_dict[action]
+        if opcode == DECK_HEAP:
+            self.deck_to_heap(args[0], args[1])
+        elif opcode == DECK_COL:
+            self.deck_to_column(args[0], args[1])
+        elif opcode == COL_HEAP:
+            self.column_to_heap(args[0], args[1], reveal)
+        elif opcode == HEAP_COL:
+            self.heap_to_column(args[0], args[1])
+        else:
+            self.column_to_column(args[0], args[1], args[2], reveal)
+        self.legal_actions()
+
+        self.score += self.reward
+        self.time += 1
+        _, state = self.get_state()
+        self.states_stack.append(state)
+
+    def get_state(self):
+        state = []
+        for color in COLORS:
+            for rank in CARDS:
+                if (rank, color) in self.cards_state:
+                    state.append(self.cards_state[(rank, color)])
+                else:
+                    state.append(self.state_dict[UNDRAWN])
+        return state, ''.join(str(x) for x in state)
+
+
+def snapshot(game):
+    """
+    Retrieves everything that undoing an action has to restore
+    :param game: (Solitaire_Engine or Compact_Engine) the game
+    :return: (tuple) the snapshot
+    """
+    common = (game.get_state()[0], game.hash, sorted(game.actions_dict.items()),
+              game.reward, game.score, game.time)
+    if isinstance(game, Compact_Engine):
+        return common + (bytes(game.buffer), frozenset(game.seen_states))
+    return common + (list(game.sub_deck), list(game.sub_deck_index),
+                     [(list(column.cards), column.nb_todraw) for column in game.columns],
+                     [list(heap.cards) for heap in game.heaps], len(game.main_deck.cards),
+                     list(game.states_stack), frozenset(game.states_set))
+
+
+def check_undo(game, action):
+    """
+    Checks that undoing an action restores the game
+    :param game: (Solitaire_Engine or Compact_Engine) the game
+    :param action: (int) key of the action
+    :return: the rank and color of the card revealed by the action, None if it reveals no card
+    """
+    before = snapshot(game)
+    record = game.play(action)
+    game.undo(record)
+    assert snapshot(game) == before, "undo of " + ACTION_INDEX_NAME[action] + " does not restore the game"
+    return (record.revealed.rank, record.revealed.color) if record.revealed is not None else None
+
+
+def check_game(seed, max_turns):
+    """
+    Plays a random game and compares the engines with the reference after each action
+    :param seed: (int) seed of the deal and of the random actions
+    :param max_turns: (int) maximum number of turns
+    :return: the number of positions checked
+    """
+    rng = rd.Random(seed)
+    solitaire = Solitaire_Engine(seed)
+    compact = Compact_Engine(seed=seed)
+    reference = Reference_Engine(solitaire)
+    for turn in range(max_turns):
+        where = "deal " + str(seed) + " turn " + str(turn)
+        actions = reference.actions_dict
+        assert solitaire.actions_dict == actions, "Solitaire_Engine actions differ - " + where
+        assert compact.actions_dict == actions, "Compact_Engine actions differ - " + where
+        if solitaire.is_over(): break
+
+        action = rng.choice(sorted(actions))
+        reveal = check_undo(solitaire, action)
+        check_undo(compact, action)
+        # The action is played for good with the card revealed while checking its undoing
+        solitaire.play(action, reveal)
+        compact.play(action, reveal)
+        reference.play(action, reveal)
+
+        state = reference.get_state()[0]
+        assert solitaire.get_state()[0] == state, "Solitaire_Engine state differs - " + where
+        assert compact.get_state()[0] == state, "Compact_Engine state differs - " + where
+        assert solitaire.hash == compact.hash, "hashes differ - " + where
+        assert solitaire.sub_deck_index == reference.sub_deck_index, "drawn cards differ - " + where
+        assert solitaire.reward == compact.reward == reference.reward, "rewards differ - " + where
+    return turn + 1
+
+
+if __name__ == '__main__':
+    nb_games = int(sys.argv[1]) if len(sys.argv) > 1 else NB_GAMES
+    start = time.perf_counter()
+    nb_positions = 0
+    for seed in range(nb_games):
+        nb_positions += check_game(seed, MAX_TURNS)
+    print("legal_actions_diff: " + str(nb_games) + " games - " + str(nb_positions) + " positions - " +
+          "no difference - " + str(round(time.perf_counter() - start, 1)) + " s")
@@ -0,0 +1,40 @@
+from __future__ import division
+import random as rd
+import sys
+import time
+from multiprocessing import cpu_count
+from Game.solitaire_engine import *
+from IA.parallel_mcts import *
+from Benchmark.common import *
+
+NB_TRAJECTORIES = 200
+SAMPLING_WIDTH = 10
+NB_TURNS = 3
+
+
+def benchmark(nb_workers, leaf, games):
+    """
+    Measures the number of trajectories per second of a parallel MCTS
+    :param nb_workers: (int) number of worker processes
+    :param leaf: (bool) use leaf parallelization instead of root parallelization
+    :param games: (list (Solitaire_Engine)) positions to search
+    """
+    with Parallel_Mcts(nb_workers) as search:
+        start = time.perf_counter()
+        for game in games:
+            if leaf: search.leaf_search(game, NB_TRAJECTORIES // nb_workers, SAMPLING_WIDTH)
+            else: search.tree_search(game, NB_TRAJECTORIES, SAMPLING_WIDTH)
+        elapsed = time.perf_counter() - start
+    return NB_TRAJECTORIES * len(games) / elapsed
+
+
+if __name__ == '__main__':
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else cpu_count()
+    rd.seed(0)
+    games = collect_positions([None], NB_TURNS)
+
+    for nb_workers in range(1, max_workers + 1):
+        for leaf in (False, True):
+            rate = benchmark(nb_workers, leaf, games)
+            print(("leaf" if leaf else "root") + " - " + str(nb_workers) + " workers - " +
+                  str(int(rate)) + " trajectories/s")
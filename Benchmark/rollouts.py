@@ -0,0 +1,67 @@
+from __future__ import division
+import random as rd
+import sys
+import time
+import numpy as np
+from Game.batch_engine import *
+from IA.mcts_stocha import *
+from Benchmark.common import *
+
+NB_POSITIONS = 10
+NB_TURNS = 20
+NB_ROLLOUTS = 64
+BATCH_SIZES = [1, 8, 64, 256]
+
+
+def collect_random_positions(nb_positions, nb_turns):
+    """
+    Plays random games and keeps one position of each of them
+    :param nb_positions: (int) number of positions to collect
+    :param nb_turns: (int) maximum number of turns played before a position is kept
+    :return: the list of collected games
+    """
+    positions = []
+    while len(positions) < nb_positions:
+        positions += collect_positions([None], rd.randint(0, nb_turns) + 1)[-1:]
+    return positions
+
+
+def benchmark_simulation(positions, nb_rollouts):
+    """
+    Measures the number of playouts per second of Mcts_Stocha.simulation
+    :param positions: (list (Solitaire_Engine)) starting positions of the playouts
+    :param nb_rollouts: (int) number of playouts from each position
+    """
+    start = time.perf_counter()
+    for solitaire in positions:
+        mcts = Mcts_Stocha(solitaire)
+        for i in range(nb_rollouts):
+            mcts.simulation(solitaire)
+    return nb_rollouts * len(positions) / (time.perf_counter() - start)
+
+
+def benchmark_batch(positions, nb_rollouts, batch_size):
+    """
+    Measures the number of playouts per second of a Batch_Engine
+    :param positions: (list (Solitaire_Engine)) starting positions of the playouts
+    :param nb_rollouts: (int) number of playouts from each position
+    :param batch_size: (int) number of playouts played at once
+    """
+    nb_batches = max(nb_rollouts // batch_size, 1)
+    start = time.perf_counter()
+    for solitaire in positions:
+        for i in range(nb_batches):
+            Batch_Engine(solitaire, batch_size).rollouts(GAMMA, FACTOR_THRESHOLD)
+    return nb_batches * batch_size * len(positions) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    rd.seed(seed)
+    np.random.seed(seed)
+    positions = collect_random_positions(NB_POSITIONS, NB_TURNS)
+    rate = benchmark_simulation(positions, NB_ROLLOUTS)
+    print("simulation - " + str(int(rate)) + " playouts/s")
+    for batch_size in BATCH_SIZES:
+        rate = benchmark_batch(positions, NB_ROLLOUTS, batch_size)
+        print("batch of " + str(batch_size) + " - " + str(int(rate)) + " playouts/s")
@@ -0,0 +1,55 @@
+from __future__ import division
+import random as rd
+import sys
+import time
+from Game.solitaire_engine import *
+from IA.mcts_stocha import *
+from Benchmark.common import *
+
+NB_TURNS = 5
+NB_TRAJECTORIES = 300
+SAMPLING_WIDTH = 10
+NB_WALKS = 2000
+
+
+def build_trees(nb_turns, nb_trajectories):
+    """
+    Builds the search trees of the first positions of a random game
+    :param nb_turns: (int) number of positions
+    :param nb_trajectories: (int) number of simulations of each search
+    :return: the list of searches
+    """
+    searches = []
+    for solitaire in collect_positions([None], nb_turns):
+        mcts = Mcts_Stocha(solitaire)
+        mcts.tree_search(nb_trajectories, SAMPLING_WIDTH)
+        searches.append(mcts)
+    return searches
+
+
+def benchmark(searches, nb_walks):
+    """
+    Measures the number of selection walks per second down the search trees
+    :param searches: (list (Mcts_Stocha)) searches whose trees are walked
+    :param nb_walks: (int) number of walks down each tree
+    :return: the number of walks per second and the mean depth of the walks
+    """
+    depth = 0
+    start = time.perf_counter()
+    for mcts in searches:
+        for i in range(nb_walks):
+            moves, path = [], []
+            mcts.select(mcts.root, SAMPLING_WIDTH, moves, path)
+            mcts.undo(moves)
+            depth += len(path)
+    elapsed = time.perf_counter() - start
+    nb = nb_walks * len(searches)
+    return nb / elapsed, depth / nb
+
+
+if __name__ == '__main__':
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    rd.seed(seed)
+    searches = build_trees(NB_TURNS, NB_TRAJECTORIES)
+    walks, depth = benchmark(searches, NB_WALKS)
+    print("select: " + str(int(walks)) + " walks/s - mean depth " + str(round(depth, 2)))
@@ -0,0 +1,44 @@
+from __future__ import division
+import sys
+from Game.solver import *
+
+NB_DEALS = 20
+# Budget of the search of each deal, deals not solved within it being counted as unknown
+TIME_LIMIT = 2.0
+# Deals 0 to 19 with a budget of 2 s give about 3700 positions/s, 8 deals won and 12 unknown: about
+# 1200 decided deals/h for 3000 deals/h, short of thousands of decided deals per hour. The unknown
+# deals stay open long after their budget (deal 0 after 170000 positions), so a faster search
+# barely decides more of them.
+MAX_NODES = None
+
+
+def benchmark(seeds, time_limit, max_nodes):
+    """
+    Solves deals whose face-down cards are known and reports the result of each of them
+    :param seeds: (list (int)) seeds of the deals
+    :param time_limit: (float) maximum duration of the search of each deal in seconds
+    :param max_nodes: (int) maximum number of positions searched for each deal
+    :return: the number of deals won, lost and unknown, the total duration and number of positions
+    """
+    counts = {True: 0, False: 0, None: 0}
+    total_time, total_nodes = 0.0, 0
+    for seed in seeds:
+        game, assignment = known_deal(seed)
+        solver = Solver(game, assignment, max_nodes, time_limit)
+        result = solver.solve()
+        counts[result] += 1
+        total_time += solver.solve_time
+        total_nodes += solver.nb_nodes
+        print("deal " + str(seed) + ": " + {True: "won", False: "lost", None: "unknown"}[result] + " - " +
+              str(round(solver.solve_time, 3)) + " s - " + str(solver.nb_nodes) + " nodes")
+    return counts[True], counts[False], counts[None], total_time, total_nodes
+
+
+if __name__ == '__main__':
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    nb_won, nb_lost, nb_unknown, total_time, total_nodes = benchmark(range(seed, seed + NB_DEALS), TIME_LIMIT,
+                                                                     MAX_NODES)
+    print(str(nb_won) + " won - " + str(nb_lost) + " lost - " + str(nb_unknown) + " unknown")
+    # Deals stopped by the budget count in the duration, the rate of decided deals is the one that matters
+    print(str(int((nb_won + nb_lost) * 3600 / total_time)) + " decided deals/h - " +
+          str(int(NB_DEALS * 3600 / total_time)) + " deals/h - " + str(int(total_nodes / total_time)) + " nodes/s")
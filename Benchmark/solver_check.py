@@ -0,0 +1,79 @@
+from __future__ import division
+import random as rd
+import sys
+import time
+from Game.solver import *
+
+# Deals the solver proves lost by exhausting its search, none of their cards being blocked at the root
+LOST_DEALS = [106, 128]
+# Deals the solver wins
+WON_DEALS = [8, 9, 10, 13]
+NB_POSITIONS = 20
+# Maximum number of random actions played from a deal to reach a checked position
+MAX_TURNS = 60
+MAX_NODES = 20000
+
+
+class Uncut_Solver(Solver):
+    """
+    Class defining a solver trying every action, to check that the cuts of the solver lose no win
+    """
+
+    def ordered_actions(self, game, cuts):
+        return Solver.ordered_actions(self, game, False)
+
+
+def check_solution(game, solver):
+    """
+    Checks that the solution of a solver wins the game
+    :param game: (Compact_Engine) the solved game, left unchanged
+    :param solver: (Solver) the solver
+    """
+    replay = game.clone()
+    for action in solver.solution:
+        replay.play(action, reveal_key(replay, solver.assignment, action))
+    assert replay.is_won(), "the solution does not win"
+
+
+def check_position(game, assignment, max_nodes):
+    """
+    Solves a position with and without the cuts of the solver and compares the results
+    :param game: (Compact_Engine) the position
+    :param assignment: (list (list ((int, string)))) face-down cards of each column
+    :param max_nodes: (int) maximum number of positions searched by each solver
+    :return: the result of the solver
+    """
+    solver = Solver(game, assignment, max_nodes)
+    result = solver.solve()
+    if result: check_solution(game, solver)
+    uncut = Uncut_Solver(game, assignment, max_nodes).solve()
+    # Either search may be stopped by the budget, but they never disagree on a decided deal
+    assert None in (result, uncut) or result == uncut, "the cuts change the result"
+    return result
+
+
+if __name__ == '__main__':
+    nb_positions = int(sys.argv[1]) if len(sys.argv) > 1 else NB_POSITIONS
+    start = time.perf_counter()
+    for seed in LOST_DEALS:
+        game, assignment = known_deal(seed)
+        assert Solver(game, assignment, MAX_NODES).solve() is False, "deal " + str(seed) + " is not lost"
+    for seed in WON_DEALS:
+        game, assignment = known_deal(seed)
+        solver = Solver(game, assignment, MAX_NODES)
+        assert solver.solve(), "deal " + str(seed) + " is not won"
+        check_solution(game, solver)
+
+    # Positions reached by random actions, their met states being banned from the search
+    rng = rd.Random(0)
+    counts = {True: 0, False: 0, None: 0}
+    for seed in range(nb_positions):
+        game, assignment = known_deal(seed)
+        for turn in range(rng.randrange(MAX_TURNS)):
+            if game.is_over(): break
+            action = rng.choice(sorted(game.actions_dict))
+            game.play(action, reveal_key(game, assignment, action))
+        counts[check_position(game, assignment, MAX_NODES)] += 1
+    print("solver_check: " + str(len(LOST_DEALS)) + " lost and " + str(len(WON_DEALS)) + " won deals - " +
+          str(nb_positions) + " positions (" + str(counts[True]) + " won, " + str(counts[False]) + " lost, " +
+          str(counts[None]) + " unknown) - no difference - " + str(round(time.perf_counter() - start, 1)) + " s")
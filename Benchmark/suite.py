@@ -0,0 +1,281 @@
+from __future__ import division
+import argparse
+import json
+import os.path
+import sys
+import time
+import tracemalloc
+from statistics import median
+from Game.solitaire_engine import *
+from IA.mcts_stocha import *
+from Game.state_encoder import *
+from Benchmark.common import *
+
+# Seeds of the deals every case is run on
+DEAL_SEEDS = [0, 1, 2, 3, 4]
+# Seed of the random actions and of the searches
+SEARCH_SEED = 0
+# Number of turns after which a random game is stopped, random games rarely ending by themselves
+MAX_TURNS = 500
+# Number of positions collected in each deal
+NB_POSITIONS = 20
+# Number of trajectories and sampling widths of the tree_search cases
+TRAJECTORIES = [50, 200]
+SAMPLING_WIDTHS = [1, 10]
+# Number of timed runs of each case, the median one being kept, and minimum duration of a run
+NB_REPEATS = 5
+MIN_RUN_TIME = 0.5
+# Relative loss of speed or gain of memory above which a case is a regression. Speeds are compared
+# relative to the calibration workload timed before each run, operations per second depending on
+# the machine and on its load: the baseline only holds across machines of a similar kind, and
+# should be regenerated with --update-baseline on a different machine or version of Python
+TOLERANCE = 0.25
+# Number of iterations of the calibration workload
+NB_CALIBRATION = 20000
+RESULTS_FILE = os.path.join("Benchmark", "results.json")
+BASELINE_FILE = os.path.join("Benchmark", "baseline.json")
+
+
+def construction(positions):
+    """
+    Deals a new game from each seed
+    :param positions: (list (Solitaire_Engine)) collected positions
+    :return: the number of operations performed
+    """
+    for seed in DEAL_SEEDS:
+        Solitaire_Engine(seed)
+    return len(DEAL_SEEDS)
+
+
+def legal_actions(positions):
+    """
+    Computes the legal actions of each position
+    :param positions: (list (Solitaire_Engine)) collected positions
+    :return: the number of operations performed
+    """
+    for solitaire in positions:
+        solitaire.legal_actions()
+    return len(positions)
+
+
+def play(positions):
+    """
+    Plays and undoes each legal action of each position
+    :param positions: (list (Solitaire_Engine)) collected positions
+    :return: the number of operations performed
+    """
+    # Each action is undone so that the positions can be reused
+    nb = 0
+    for solitaire in positions:
+        for action in sorted(solitaire.actions_dict):
+            solitaire.undo(solitaire.play(action))
+            nb += 1
+    return nb
+
+
+def get_state(positions):
+    """
+    Encodes the state of each position
+    :param positions: (list (Solitaire_Engine)) collected positions
+    :return: the number of operations performed
+    """
+    for solitaire in positions:
+        solitaire.get_state()
+    return len(positions)
+
+
+def encode_batch(positions):
+    """
+    Encodes all the positions at once
+    :param positions: (list (Solitaire_Engine)) collected positions
+    :return: the number of operations performed
+    """
+    encode(positions)
+    return len(positions)
+
+
+def chance_action(positions):
+    """
+    Checks whether each legal action of each position reveals a card
+    :param positions: (list (Solitaire_Engine)) collected positions
+    :return: the number of operations performed
+    """
+    nb = 0
+    for solitaire in positions:
+        for action in solitaire.actions_dict:
+            solitaire.chance_action(action)
+            nb += 1
+    return nb
+
+
+def random_game(positions):
+    """
+    Plays a random game from each deal, stopped after MAX_TURNS turns
+    :param positions: (list (Solitaire_Engine)) collected positions
+    :return: the number of operations performed
+    """
+    rng = rd.Random(SEARCH_SEED)
+    nb = 0
+    for seed in DEAL_SEEDS:
+        solitaire = Solitaire_Engine(seed)
+        while not solitaire.is_over() and solitaire.time < MAX_TURNS:
+            solitaire.play(rng.choice(sorted(solitaire.actions_dict)))
+        nb += solitaire.time
+    return nb
+
+
+def tree_search(nb_trajectories, sampling_width):
+    """
+    Builds the case of a tree search of the first position of each deal
+    :param nb_trajectories: (int) number of trajectories of each search
+    :param sampling_width: (int) sampling width of each search
+    :return: the function running the case
+    """
+    def case(positions):
+        # Searches start from the deals rather than from the collected positions
+        for seed in DEAL_SEEDS:
+            Mcts_Stocha(Solitaire_Engine(seed), seed=SEARCH_SEED).tree_search(nb_trajectories, sampling_width)
+        return nb_trajectories * len(DEAL_SEEDS)
+    return case
+
+
+def calibration():
+    """
+    Runs a fixed pure-Python workload, independent of the code of the repository, whose speed
+    gives the speed of the machine at the time of a run
+    :return: the number of operations performed
+    """
+    table = dict()
+    total = 0
+    for i in range(NB_CALIBRATION):
+        table[i % 101] = table.get(i % 101, 0) + i
+        total += len(str(i)) * (i & 7)
+    return 1
+
+
+def timed_run(case, positions):
+    """
+    Times a run of a case
+    :param case: (function) the case to run
+    :param positions: (list (Solitaire_Engine)) positions given to the case
+    :return: the number of operations per second of the run
+    """
+    # Fast cases are repeated so that each run lasts long enough to be timed reliably
+    nb = 0
+    start = time.perf_counter()
+    while nb == 0 or time.perf_counter() - start < MIN_RUN_TIME:
+        nb += case(positions)
+    return nb / (time.perf_counter() - start)
+
+
+def build_cases():
+    """
+    Lists the cases of the suite
+    :return: the list of (name, function) of the cases, a function taking the collected
+             positions and returning the number of operations it performed
+    """
+    cases = [("construction", construction), ("legal_actions", legal_actions), ("play", play),
+             ("get_state", get_state), ("encode", encode_batch), ("chance_action", chance_action),
+             ("random_game", random_game)]
+    for nb_trajectories in TRAJECTORIES:
+        for sampling_width in SAMPLING_WIDTHS:
+            name = "tree_search-" + str(nb_trajectories) + "-" + str(sampling_width)
+            cases.append((name, tree_search(nb_trajectories, sampling_width)))
+    return cases
+
+
+def measure(case, positions, nb_repeats):
+    """
+    Measures the speed and the memory of a case
+    :param case: (function) the case to run
+    :param positions: (list (Solitaire_Engine)) positions given to the case
+    :param nb_repeats: (int) number of timed runs, and of runs measuring the memory
+    :return: the median number of operations per second of the runs, the median ratio of the speed
+             of each run to the speed of the calibration run timed just before it, and the median
+             peak of allocated bytes per operation, measured in separate runs
+    """
+    speeds = []
+    relative_speeds = []
+    for i in range(nb_repeats):
+        # The calibration is timed next to the run, so that both are slowed down alike by the load
+        reference = timed_run(lambda positions: calibration(), positions)
+        speeds.append(timed_run(case, positions))
+        relative_speeds.append(speeds[-1] / reference)
+    # Tracing slows the code down, so memory is measured apart from time
+    peaks = []
+    for i in range(nb_repeats):
+        tracemalloc.start()
+        nb = case(positions)
+        peaks.append(tracemalloc.get_traced_memory()[1] / nb)
+        tracemalloc.stop()
+    return {"ops_per_sec": median(speeds), "relative_speed": median(relative_speeds),
+            "bytes_per_op": median(peaks)}
+
+
+def run(nb_repeats):
+    """
+    Runs all the cases of the suite
+    :param nb_repeats: (int) number of timed runs of each case
+    :return: the results of each case, by name
+    """
+    positions = collect_positions(DEAL_SEEDS, NB_POSITIONS, rd.Random(SEARCH_SEED))
+    results = dict()
+    for name, case in build_cases():
+        results[name] = measure(case, positions, nb_repeats)
+        print(name + ": " + str(int(results[name]["ops_per_sec"])) + " ops/s - " +
+              str(round(results[name]["relative_speed"], 4)) + " x calibration - " +
+              str(int(results[name]["bytes_per_op"])) + " bytes/op")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares results with a baseline
+    :param results: (dict) results of the cases, by name
+    :param baseline: (dict) baseline results of the cases, by name
+    :param tolerance: (float) relative loss of speed, against the calibration, or gain of memory allowed
+    :return: the list of regressions, as messages
+    """
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline: continue
+        speed = results[name]["relative_speed"] / baseline[name]["relative_speed"]
+        if speed < 1 - tolerance:
+            regressions.append(name + " is " + str(round((1 - speed) * 100)) + "% slower")
+        memory = results[name]["bytes_per_op"] / max(baseline[name]["bytes_per_op"], 1)
+        if memory > 1 + tolerance:
+            regressions.append(name + " uses " + str(round((memory - 1) * 100)) + "% more memory")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark of the engine and search hot paths")
+    parser.add_argument("--output", default=RESULTS_FILE, help="file where the results are saved")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="file of the baseline results")
+    parser.add_argument("--update-baseline", action="store_true", help="save the results as baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed relative regression")
+    parser.add_argument("--repeats", type=int, default=NB_REPEATS, help="number of timed runs of each case")
+    args = parser.parse_args()
+    if not args.update_baseline:
+        if not os.path.exists(args.baseline):
+            sys.exit("No baseline in " + args.baseline + ", run with --update-baseline to save one")
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        # Baselines saved before speeds were measured against the calibration cannot be compared
+        if any("relative_speed" not in case for case in baseline.values()):
+            sys.exit("The baseline in " + args.baseline + " has no relative speeds, run with --update-baseline")
+
+    results = run(args.repeats)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print("Baseline saved in " + args.baseline)
+    else:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION: " + regression)
+        if regressions: sys.exit(1)
+        print("No regression against " + args.baseline)
@@ -0,0 +1,52 @@
+from __future__ import division
+import copy
+import random as rd
+import sys
+import time
+import tracemalloc
+from Game.solitaire_engine import *
+from IA.mcts_stocha import *
+from Benchmark.common import *
+
+NB_POSITIONS = 3
+NB_TRAJECTORIES = 1000
+SAMPLING_WIDTH = 10
+
+
+def benchmark(positions, nb_trajectories):
+    """
+    Measures the number of trajectories per second of tree searches
+    :param positions: (list (Solitaire_Engine)) positions to search
+    :param nb_trajectories: (int) number of simulations of each search
+    """
+    start = time.perf_counter()
+    for solitaire in positions:
+        Mcts_Stocha(solitaire).tree_search(nb_trajectories, SAMPLING_WIDTH)
+    return nb_trajectories * len(positions) / (time.perf_counter() - start)
+
+
+def node_size(solitaire, nb_trajectories):
+    """
+    Measures the memory used by the nodes of a search tree
+    :param solitaire: (Solitaire_Engine) position to search
+    :param nb_trajectories: (int) number of simulations of the search
+    :return: the number of bytes per node
+    """
+    mcts = Mcts_Stocha(solitaire)
+    mcts.tree_search(nb_trajectories, SAMPLING_WIDTH)
+    # Nodes are copied so that only the memory they keep is measured, the copy being kept alive
+    # until it is measured
+    tracemalloc.start()
+    root = copy.deepcopy(mcts.root, {id(solitaire): solitaire})
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(mcts.subtree(root))
+
+
+if __name__ == '__main__':
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    rd.seed(seed)
+    positions = collect_positions([None], NB_POSITIONS)
+    trajectories = benchmark(positions, NB_TRAJECTORIES)
+    size = node_size(positions[0], NB_TRAJECTORIES)
+    print("tree_search: " + str(int(trajectories)) + " trajectories/s - " + str(int(size)) + " bytes/node")
@@ -0,0 +1,121 @@
+import json
+import os
+import random as rd
+import numpy as np
+import pandas as pd
+from Dataset.shard_writer import *
+
+STATES_FILE = 'states.npy'
+POLICIES_FILE = 'policies.npy'
+REWARDS_FILE = 'rewards.npy'
+# Number of rows converted at once
+CHUNK_SIZE = 10000
+
+
+def convert(chunks, nb_rows, header, directory):
+    """
+    Writes samples to the memory-mapped arrays of a dataset
+    :param chunks: (iterable (np.array)) samples, one row per sample and one column per column of the header
+    :param nb_rows: (int) total number of samples
+    :param header: (list (string)) names of the columns of the samples
+    :param directory: (string) directory of the arrays
+    """
+    os.makedirs(directory, exist_ok=True)
+    nb_actions = len(header) - NB_STATE_COLUMNS - 1
+    path = os.path.join(directory, STATES_FILE)
+    states = np.lib.format.open_memmap(path, 'w+', np.int8, (nb_rows, NB_STATE_COLUMNS))
+    path = os.path.join(directory, POLICIES_FILE)
+    policies = np.lib.format.open_memmap(path, 'w+', np.float32, (nb_rows, nb_actions))
+    path = os.path.join(directory, REWARDS_FILE)
+    rewards = np.lib.format.open_memmap(path, 'w+', np.float32, (nb_rows,))
+
+    start = 0
+    for chunk in chunks:
+        end = start + len(chunk)
+        states[start:end] = chunk[:, :NB_STATE_COLUMNS]
+        policies[start:end] = chunk[:, NB_STATE_COLUMNS:-1]
+        rewards[start:end] = chunk[:, -1]
+        start = end
+    for array in (states, policies, rewards):
+        array.flush()
+
+    with open(os.path.join(directory, HEADER_FILE), 'w') as file:
+        json.dump({'columns': list(header)}, file)
+
+
+def convert_csv(file, directory, chunk_size=CHUNK_SIZE):
+    """
+    Converts a csv file written by the agent to memory-mapped arrays
+    :param file: (string) path of the csv file
+    :param directory: (string) directory of the arrays
+    :param chunk_size: (int) number of rows read at once
+    """
+    with open(file) as csv:
+        nb_rows = sum(1 for line in csv) - 1
+    header = list(pd.read_csv(file, sep=';', index_col=0, nrows=0).columns)
+    chunks = (chunk.to_numpy(dtype=np.float32)
+              for chunk in pd.read_csv(file, sep=';', index_col=0, chunksize=chunk_size))
+    convert(chunks, nb_rows, header, directory)
+
+
+def convert_shards(source, directory):
+    """
+    Converts a dataset of shards written by a Shard_Writer to memory-mapped arrays
+    :param source: (string) directory of the shards
+    :param directory: (string) directory of the arrays
+    """
+    paths = shard_paths(source)
+    nb_rows = sum(len(np.load(path, mmap_mode='r')) for path in paths)
+    chunks = (np.load(path, mmap_mode='r') for path in paths)
+    convert(chunks, nb_rows, read_header(source), directory)
+
+
+class Dataset_Reader:
+    """
+    Class serving the samples of memory-mapped arrays: states as int8, policies as float32
+    and rewards as float32. Only the rows of the requested samples are read from disk.
+    """
+
+    def __init__(self, directory):
+        """
+        Creates a new Dataset_Reader object
+        :param directory: (string) directory of the arrays, written by convert_csv or convert_shards
+        """
+        self.header = read_header(directory)
+        self.states = np.load(os.path.join(directory, STATES_FILE), mmap_mode='r')
+        self.policies = np.load(os.path.join(directory, POLICIES_FILE), mmap_mode='r')
+        self.rewards = np.load(os.path.join(directory, REWARDS_FILE), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.rewards)
+
+    def __getitem__(self, index):
+        """
+        Retrieves samples; slices are views of the files, other indexes are copied
+        :param index: (int, slice or np.array) index of the samples
+        :return: the states, policies and rewards of the samples
+        """
+        return self.states[index], self.policies[index], self.rewards[index]
+
+    def minibatches(self, batch_size, shuffle=True, drop_last=False, seed=None):
+        """
+        Iterates over the samples by minibatches
+        :param batch_size: (int) number of samples of each minibatch
+        :param shuffle: (bool) draw the samples in a random order, else serve contiguous views
+        :param drop_last: (bool) skip the last minibatch if it is smaller than the others
+        :param seed: (int) seed of the order of the samples, drawn from the global generator if None
+        :return: a generator of the states, policies and rewards of each minibatch
+        """
+        nb_samples = len(self)
+        if drop_last: nb_samples -= nb_samples % batch_size
+        order = None
+        if shuffle:
+            rng = np.random.default_rng(seed if seed is not None else rd.getrandbits(64))
+            order = rng.permutation(len(self))[:nb_samples]
+        for start in range(0, nb_samples, batch_size):
+            end = min(start + batch_size, nb_samples)
+            if order is None:
+                yield self[start:end]
+            else:
+                # Rows read in the order of the file
+                yield self[np.sort(order[start:end])]
@@ -0,0 +1,186 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from Game.card import *
+
+# Number of rows of each shard
+SHARD_SIZE = 10000
+SHARD_DTYPE = np.float32
+SHARD_PREFIX = 'shard_'
+SHARD_SUFFIX = '.npy'
+HEADER_FILE = 'header.json'
+# Suffix of the file listing the games of a shard
+GAMES_SUFFIX = '.games.json'
+# Number of columns of the state of a game, at the start of each sample
+NB_STATE_COLUMNS = len(COLORS) * len(CARDS)
+
+
+def shard_path(directory, index):
+    """
+    Retrieves the path of a shard of a dataset
+    :param directory: (string) directory of the dataset
+    :param index: (int) index of the shard
+    """
+    return os.path.join(directory, SHARD_PREFIX + str(index).zfill(5) + SHARD_SUFFIX)
+
+
+def shard_paths(directory):
+    """
+    Retrieves the paths of all the shards of a dataset, in writing order
+    :param directory: (string) directory of the dataset
+    """
+    if not os.path.isdir(directory): return []
+    names = [name for name in os.listdir(directory)
+             if name.startswith(SHARD_PREFIX) and name.endswith(SHARD_SUFFIX)]
+    return [os.path.join(directory, name) for name in sorted(names)]
+
+
+def games_path(path):
+    """
+    Retrieves the path of the file listing the games of a shard
+    :param path: (string) path of the shard
+    """
+    return path[:-len(SHARD_SUFFIX)] + GAMES_SUFFIX
+
+
+def written_games(directory):
+    """
+    Retrieves the identifiers of the games whose samples are in the shards of a dataset
+    :param directory: (string) directory of the dataset
+    """
+    games = set()
+    for path in shard_paths(directory):
+        if os.path.exists(games_path(path)):
+            with open(games_path(path)) as file:
+                games.update(json.load(file))
+    return games
+
+
+def read_header(directory):
+    """
+    Retrieves the names of the columns of a dataset
+    :param directory: (string) directory of the dataset
+    """
+    with open(os.path.join(directory, HEADER_FILE)) as file:
+        return json.load(file)['columns']
+
+
+def read_seed(directory):
+    """
+    Retrieves the seed recorded with a dataset by the run that wrote it
+    :param directory: (string) directory of the dataset
+    :return: (int) the seed, None if the dataset has none
+    """
+    path = os.path.join(directory, HEADER_FILE)
+    if not os.path.exists(path): return None
+    with open(path) as file:
+        return json.load(file).get('seed')
+
+
+class Shard_Writer:
+    """
+    Class writing samples to a dataset made of NumPy shards of bounded size, so that only one
+    shard is kept in memory. A shard is written once full or flushed, and is never modified:
+    flushing after each game keeps the samples of the finished games if the run crashes.
+    The samples of a game are never split between two shards.
+    """
+
+    def __init__(self, directory, header, shard_size=SHARD_SIZE, seed=None):
+        """
+        Creates a new Shard_Writer object, adding shards after those already in the directory
+        :param directory: (string) directory of the dataset
+        :param header: (list (string)) names of the columns of the samples
+        :param shard_size: (int) number of rows of each shard
+        :param seed: (int) seed of the run writing the samples, recorded with the dataset, None
+                     for none
+        """
+        self.directory = directory
+        self.header = list(header)
+        self.shard_size = shard_size
+        self.buffer = np.zeros((shard_size, len(self.header)), dtype=SHARD_DTYPE)
+        self.nb_rows = 0
+        # Identifiers of the games of the buffered samples
+        self.games = []
+        self.nb_shards = len(shard_paths(directory))
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, HEADER_FILE)
+        if os.path.exists(path):
+            if read_header(directory) != self.header:
+                raise ValueError("The columns of " + directory + " are different")
+            if seed is not None and read_seed(directory) not in (None, seed):
+                raise ValueError("The seed of " + directory + " is different")
+        if seed is not None or not os.path.exists(path):
+            content = {'columns': self.header}
+            if seed is not None: content['seed'] = seed
+            with open(path, 'w') as file:
+                json.dump(content, file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add_game(self, samples, score, game=None):
+        """
+        Adds the samples of a game
+        :param samples: (list (list)) state and action probabilities of each turn of the game
+        :param score: (int) final score of the game, added at the end of each sample
+        :param game: (int) identifier of the game, saved with its shard, None for none
+        """
+        if self.nb_rows + len(samples) > len(self.buffer): self.flush()
+        # A game longer than a shard gets a shard of its own
+        if len(samples) > len(self.buffer):
+            self.buffer = np.zeros((len(samples), len(self.header)), dtype=SHARD_DTYPE)
+
+        end = self.nb_rows + len(samples)
+        if samples: self.buffer[self.nb_rows:end, :-1] = samples
+        self.buffer[self.nb_rows:end, -1] = score
+        self.nb_rows = end
+        if game is not None: self.games.append(game)
+        if self.nb_rows == len(self.buffer): self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered samples as a new shard
+        """
+        if not self.nb_rows: return
+
+        path = shard_path(self.directory, self.nb_shards)
+        if self.games:
+            with open(games_path(path), 'w') as file:
+                json.dump(self.games, file)
+        # The shard only gets its name once fully written
+        with open(path + '.tmp', 'wb') as file:
+            np.save(file, self.buffer[:self.nb_rows])
+        os.replace(path + '.tmp', path)
+        self.nb_shards += 1
+        self.nb_rows = 0
+        self.games = []
+        if len(self.buffer) > self.shard_size:
+            self.buffer = np.zeros((self.shard_size, len(self.header)), dtype=SHARD_DTYPE)
+
+    def close(self):
+        """
+        Writes the last samples
+        """
+        self.flush()
+
+
+def export_csv(directory, file):
+    """
+    Exports a dataset to a csv file, one shard at a time
+    :param directory: (string) directory of the dataset
+    :param file: (string) path of the csv file
+    """
+    header = read_header(directory)
+    int_columns = header[:NB_STATE_COLUMNS] + header[-1:]
+    index = 0
+    for i, path in enumerate(shard_paths(directory)):
+        shard = np.load(path)
+        dataframe = pd.DataFrame(shard, columns=header, index=range(index, index + len(shard)))
+        dataframe[int_columns] = dataframe[int_columns].astype(int)
+        dataframe.to_csv(file, sep=';', mode='w' if i == 0 else 'a', header=(i == 0))
+        index += len(shard)
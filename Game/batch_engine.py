@@ -0,0 +1,373 @@
+from __future__ import division
+import numpy as np
+from Game.compact_engine import *
+
+# Code of a missing card in the arrays of a batch
+BATCH_NO_CARD = NB_CARDS
+# Maximum number of distinct drawn cards reachable by drawing, the empty draw included
+NB_DRAWS = NB_CARDS_SUBDECK + 1
+
+# Layout of the actions of a batch: deck moves for each number of draws, then col-heap,
+# heap-col and col-col moves
+COL_HEAP_ACTIONS = NB_DRAWS * NB_DECK_TARGETS
+HEAP_COL_ACTIONS = COL_HEAP_ACTIONS + NB_HEAPS * NB_COLUMNS
+COL_COL_ACTIONS = HEAP_COL_ACTIONS + NB_HEAPS * NB_COLUMNS
+NB_BATCH_ACTIONS = COL_COL_ACTIONS + NB_COLUMNS * NB_COLUMNS
+
+# Rank and color of each card code, the missing card included
+CARD_RANK = np.array([code_rank(code) for code in range(NB_CARDS)] + [0])
+CARD_RED = np.array([code_red(code) for code in range(NB_CARDS)] + [False])
+# Zobrist keys of each card code and location value, the missing card having null keys
+ZOBRIST_KEYS = np.array(ZOBRIST + [[0] * NB_ZOBRIST_VALUES], dtype=np.uint64)
+
+COLUMN_DEPTHS = np.arange(len(CARDS))
+COLUMN_INDEXES = np.arange(NB_COLUMNS)
+OTHER_COLUMNS = ~np.eye(NB_COLUMNS, dtype=bool)
+
+
+def build_draw_tables():
+    """
+    Builds the drawn cards reachable by drawing from each configuration of the sub-deck
+    :return: for each number of cards and index of the top drawn card (shifted by one), the
+             index of the top drawn card and the number of drawn cards after each number of draws,
+             and whether this number of draws leads to a card not reached with fewer draws
+    """
+    indexes = np.full((NB_DRAWS, NB_DRAWS, NB_DRAWS), -1)
+    lengths = np.zeros((NB_DRAWS, NB_DRAWS, NB_DRAWS), dtype=int)
+    valid = np.zeros((NB_DRAWS, NB_DRAWS, NB_DRAWS), dtype=bool)
+    for nb_cards in range(NB_DRAWS):
+        for top in range(-1, nb_cards):
+            index = top
+            seen_indexes = {index}
+            for nb_draw in range(NB_DRAWS):
+                indexes[nb_cards, top + 1, nb_draw] = index
+                valid[nb_cards, top + 1, nb_draw] = nb_cards > 0
+                if not nb_cards: break
+                start = index + 1 if index + 1 < nb_cards else 0
+                index = min(start + 3, nb_cards) - 1
+                if index in seen_indexes: break
+                seen_indexes.add(index)
+                lengths[nb_cards, top + 1, nb_draw + 1] = index - start + 1
+    return indexes, lengths, valid
+
+
+DRAW_INDEXES, DRAW_LENGTHS, DRAW_VALID = build_draw_tables()
+
+
+def can_add_heap(cards, tops):
+    """
+    Checks if cards can be added to heaps, for arrays of card codes
+    :param cards: (np.array) codes of the cards
+    :param tops: (np.array) codes of the top cards of the heaps
+    """
+    ranks = CARD_RANK[cards]
+    return (cards != BATCH_NO_CARD) & \
+           np.where(tops == BATCH_NO_CARD, ranks == ACE, (cards == tops + 1) & (ranks != ACE))
+
+
+def can_add_column(cards, tops):
+    """
+    Checks if cards can be added to columns, for arrays of card codes
+    :param cards: (np.array) codes of the cards
+    :param tops: (np.array) codes of the top cards of the columns
+    """
+    ranks = CARD_RANK[cards]
+    return (cards != BATCH_NO_CARD) & \
+           np.where(tops == BATCH_NO_CARD, ranks == KING,
+                    (ranks == CARD_RANK[tops] - 1) & (CARD_RED[cards] != CARD_RED[tops]))
+
+
+class Batch_Engine:
+    """
+    Batch of Solitaire games played at once, with one row of arrays per game.
+    The layout follows the one of Compact_Engine, and moves are played in all the games
+    together by NumPy operations. The safe moves to the heaps are never played automatically.
+    """
+
+    def __init__(self, game, nb_games, rng=None):
+        """
+        Creates a new Batch_Engine object, all the games starting from the same position
+        :param game: (Solitaire_Engine or Compact_Engine) the starting position
+        :param nb_games: (int) number of games of the batch
+        :param rng: (np.random.Generator) generator of the revealed cards and of the played
+                    actions, the global NumPy generator if None
+        """
+        if game.auto_heap: raise ValueError("A Batch_Engine cannot play the safe moves to the heaps automatically")
+        self.rng = rng if rng is not None else np.random
+        if not isinstance(game, Compact_Engine): game = Compact_Engine(game)
+        buffer = np.frombuffer(bytes(game.buffer), dtype=np.uint8).astype(int)
+        buffer[buffer == NO_CARD] = BATCH_NO_CARD
+
+        def rows(start, size):
+            return np.tile(buffer[start:start + size], (nb_games, 1))
+
+        self.nb_games = nb_games
+        self.loc = rows(LOC, NB_CARDS)
+        self.deck = rows(DECK, NB_CARDS_SUBDECK)
+        self.deck_len = rows(DECK_LEN, 1)[:, 0]
+        self.waste_len = rows(WASTE_LEN, 1)[:, 0]
+        # Index of the top drawn card of the sub-deck, -1 if no card is drawn
+        self.waste_top = np.where(self.waste_len > 0, rows(WASTE_START, 1)[:, 0] + self.waste_len - 1, -1)
+        self.col_down = rows(COL_DOWN, NB_COLUMNS)
+        self.col_up = rows(COL_UP, NB_COLUMNS)
+        self.col_top = rows(COL_TOP, NB_COLUMNS)
+        self.heap_top = rows(HEAP_TOP, NB_HEAPS)
+        self.hash = np.full(nb_games, game.hash, dtype=np.uint64)
+        # Hashes of the states met before the batch, and of the states met by each game since
+        self.seen_states = np.array(sorted(game.seen_states), dtype=np.uint64)
+        self.history = []
+
+    def is_won(self):
+        """
+        Checks which games are won
+        """
+        return np.all(CARD_RANK[self.heap_top] == KING, axis=1)
+
+    def column_cards(self):
+        """
+        Retrieves the face-up cards of the columns
+        :return: (np.array) code of the card at each depth from the top of each column
+        """
+        top = self.col_top
+        ranks = CARD_RANK[top][:, :, None] + COLUMN_DEPTHS
+        # Colors alternate along the column
+        red = CARD_RED[top][:, :, None] != (COLUMN_DEPTHS % 2 == 1)
+        first = np.where(red, RED_COLORS[0], BLACK_COLORS[0]) * NB_RANKS + ranks - 1
+        second = np.where(red, RED_COLORS[1], BLACK_COLORS[1]) * NB_RANKS + ranks - 1
+        present = (COLUMN_DEPTHS < self.col_up[:, :, None]) & (ranks <= KING)
+        first = np.where(present, first, 0)
+        first_loc = np.take_along_axis(self.loc, first.reshape(self.nb_games, -1), axis=1)
+        in_column = first_loc.reshape(first.shape) == COLUMN_INDEXES[:, None]
+        return np.where(present, np.where(in_column, first, second), BATCH_NO_CARD)
+
+    def draw_cards(self):
+        """
+        Retrieves the drawn cards reachable by drawing
+        :return: for each number of draws, the index of the top drawn card, the number of
+                 drawn cards and the code of the top drawn card
+        """
+        top = self.waste_top + 1
+        indexes = DRAW_INDEXES[self.deck_len, top]
+        lengths = DRAW_LENGTHS[self.deck_len, top]
+        lengths[:, 0] = self.waste_len
+        cards = np.take_along_axis(self.deck, np.maximum(indexes, 0), axis=1)
+        cards = np.where(DRAW_VALID[self.deck_len, top] & (indexes >= 0), cards, BATCH_NO_CARD)
+        return indexes, lengths, cards
+
+    def is_seen(self, rows, probes):
+        """
+        Checks which hashes belong to states already met
+        :param rows: (np.array) game of each hash
+        :param probes: (np.array) hashes of states of the games
+        """
+        found = np.minimum(np.searchsorted(self.seen_states, probes), len(self.seen_states) - 1)
+        seen = self.seen_states[found] == probes
+        if self.history:
+            history = np.stack(self.history, axis=1)[rows]
+            seen |= np.any(history == probes[:, None], axis=1)
+        return seen
+
+    def legal_actions(self):
+        """
+        Computes the legal actions of all the games
+        :return: (np.array) whether each action of the layout is legal in each game
+        """
+        nb_games = self.nb_games
+        heap_top, col_top = self.heap_top, self.col_top
+        self.indexes, self.lengths, self.cards = self.draw_cards()
+        self.columns = self.column_cards()
+
+        # Deck moves for each number of draws
+        deck_heap = can_add_heap(self.cards[:, :, None], heap_top[:, None, :])
+        deck_col = can_add_column(self.cards[:, :, None], col_top[:, None, :])
+        deck = np.concatenate([deck_heap, deck_col], axis=2).reshape(nb_games, -1)
+
+        # Col-heap
+        col_heap = can_add_heap(col_top[:, None, :], heap_top[:, :, None])
+
+        # Heap-col, a card never coming back to a state already met
+        heap_col = can_add_column(heap_top[:, :, None], col_top[:, None, :]) & \
+                   (CARD_RANK[heap_top] != ACE)[:, :, None]
+        heap_rows, heaps, cols = np.nonzero(heap_col)
+        cards = heap_top[heap_rows, heaps]
+        heap_probes = self.hash[heap_rows] ^ ZOBRIST_KEYS[cards, IN_HEAP_VALUE] ^ ZOBRIST_KEYS[cards, cols]
+
+        # Col-col, only one number of cards of a column can fit on another one
+        up = self.col_up[:, :, None]
+        target = col_top[:, None, :]
+        ranks = np.where(target == BATCH_NO_CARD, KING, CARD_RANK[target] - 1)
+        depth = ranks - CARD_RANK[col_top][:, :, None]
+        col_col = (depth >= 0) & (depth < up) & OTHER_COLUMNS
+        self.depth = np.clip(depth, 0, len(CARDS) - 1)
+        moved = np.take_along_axis(self.columns, self.depth, axis=2)
+        col_col &= can_add_column(moved, target)
+        # A revealed card leads to a state never seen before
+        reveal = (self.depth + 1 == up) & (self.col_down[:, :, None] > 0)
+        col_rows, cols1, cols2 = np.nonzero(col_col & ~reveal)
+        cards = self.columns[col_rows, cols1]
+        keys = ZOBRIST_KEYS[cards, cols1[:, None]] ^ ZOBRIST_KEYS[cards, cols2[:, None]]
+        keys[COLUMN_DEPTHS > self.depth[col_rows, cols1, cols2][:, None]] = 0
+        col_probes = self.hash[col_rows] ^ np.bitwise_xor.reduce(keys, axis=1)
+
+        seen = self.is_seen(np.concatenate([heap_rows, col_rows]), np.concatenate([heap_probes, col_probes]))
+        heap_col[heap_rows, heaps, cols] = ~seen[:len(heap_rows)]
+        col_col[col_rows, cols1, cols2] = ~seen[len(heap_rows):]
+
+        return np.concatenate([deck, col_heap.reshape(nb_games, -1), heap_col.reshape(nb_games, -1),
+                               col_col.reshape(nb_games, -1)], axis=1)
+
+    def set_location(self, rows, cards, values):
+        """
+        Sets the location values of cards and updates the hashes of the states
+        :param rows: (np.array) games of the cards
+        :param cards: (np.array) codes of the cards
+        :param values: (np.array) new location values of the cards
+        """
+        keys = ZOBRIST_KEYS[cards, self.loc[rows, cards]] ^ ZOBRIST_KEYS[cards, values]
+        np.bitwise_xor.at(self.hash, rows, keys)
+        self.loc[rows, cards] = values
+
+    def push_column(self, rows, cols, cards):
+        """
+        Puts cards on top of columns
+        :param rows: (np.array) games of the columns
+        :param cols: (np.array) indexes of the columns
+        :param cards: (np.array) codes of the cards
+        """
+        self.set_location(rows, cards, cols)
+        self.col_top[rows, cols] = cards
+        self.col_up[rows, cols] += 1
+
+    def pop_column(self, rows, cols, nb_cards):
+        """
+        Removes face-up cards from the top of columns
+        :param rows: (np.array) games of the columns
+        :param cols: (np.array) indexes of the columns
+        :param nb_cards: (np.array) number of cards to remove from each column
+        """
+        self.col_up[rows, cols] -= nb_cards
+        below = self.columns[rows, cols, np.minimum(nb_cards, len(CARDS) - 1)]
+        self.col_top[rows, cols] = np.where(self.col_up[rows, cols] > 0, below, BATCH_NO_CARD)
+
+    def pop_deck(self, rows, nb_draw):
+        """
+        Draws a number of times and removes the top drawn card of the sub-deck
+        :param rows: (np.array) games of the sub-decks
+        :param nb_draw: (np.array) number of times to draw in each game
+        :return: the codes of the removed cards
+        """
+        index = self.indexes[rows, nb_draw]
+        cards = self.cards[rows, nb_draw]
+        # Cards above the removed one move down by one slot
+        deck = self.deck[rows]
+        slots = np.arange(NB_CARDS_SUBDECK)
+        shifted = (slots >= index[:, None]) & (slots < self.deck_len[rows, None] - 1)
+        moved_rows, moved_slots = np.nonzero(shifted)
+        moved_cards = deck[moved_rows, moved_slots + 1]
+        self.set_location(rows[moved_rows], moved_cards, DECK_VALUE + moved_slots)
+        deck[moved_rows, moved_slots] = moved_cards
+        deck[np.arange(len(rows)), self.deck_len[rows] - 1] = BATCH_NO_CARD
+        self.deck[rows] = deck
+        self.deck_len[rows] -= 1
+
+        self.waste_len[rows] = self.lengths[rows, nb_draw] - 1
+        self.waste_top[rows] = np.where(self.waste_len[rows] > 0, index - 1, -1)
+        return cards
+
+    def reveal(self, rows, cols):
+        """
+        Reveals a random face-down card in columns whose face-up cards were all removed
+        :param rows: (np.array) games of the columns
+        :param cols: (np.array) indexes of the columns
+        :return: whether a card was revealed in each column
+        """
+        revealed = (self.col_up[rows, cols] == 0) & (self.col_down[rows, cols] > 0)
+        rows, cols = rows[revealed], cols[revealed]
+        hidden = self.loc[rows] == UNDRAWN_VALUE
+        cards = np.argmax(self.rng.random(hidden.shape) * hidden, axis=1)
+        self.col_down[rows, cols] -= 1
+        self.push_column(rows, cols, cards)
+        return revealed
+
+    def play(self, rows, actions):
+        """
+        Plays an action in each of some games
+        :param rows: (np.array) games where to play
+        :param actions: (np.array) index of the action of the layout to play in each game
+        :return: (np.array) the reward of each played action
+        """
+        rewards = np.zeros(len(rows))
+
+        # Deck moves
+        moves = actions < COL_HEAP_ACTIONS
+        deck_rows, nb_draw = rows[moves], actions[moves] // NB_DECK_TARGETS
+        targets = actions[moves] % NB_DECK_TARGETS
+        cards = self.pop_deck(deck_rows, nb_draw)
+        to_heap = targets < NB_HEAPS
+        self.set_location(deck_rows[to_heap], cards[to_heap], IN_HEAP_VALUE)
+        self.heap_top[deck_rows[to_heap], targets[to_heap]] = cards[to_heap]
+        self.push_column(deck_rows[~to_heap], targets[~to_heap] - NB_HEAPS, cards[~to_heap])
+        rewards[moves] = np.where(to_heap, 10, 5)
+
+        # Col-heap
+        moves = (actions >= COL_HEAP_ACTIONS) & (actions < HEAP_COL_ACTIONS)
+        move_rows = rows[moves]
+        heaps, cols = np.divmod(actions[moves] - COL_HEAP_ACTIONS, NB_COLUMNS)
+        cards = self.col_top[move_rows, cols]
+        self.pop_column(move_rows, cols, 1)
+        self.set_location(move_rows, cards, IN_HEAP_VALUE)
+        self.heap_top[move_rows, heaps] = cards
+        rewards[moves] = 10 + 5 * self.reveal(move_rows, cols)
+
+        # Heap-col
+        moves = (actions >= HEAP_COL_ACTIONS) & (actions < COL_COL_ACTIONS)
+        move_rows = rows[moves]
+        heaps, cols = np.divmod(actions[moves] - HEAP_COL_ACTIONS, NB_COLUMNS)
+        cards = self.heap_top[move_rows, heaps]
+        self.heap_top[move_rows, heaps] = cards - 1
+        self.push_column(move_rows, cols, cards)
+        rewards[moves] = -15
+
+        # Col-col
+        moves = actions >= COL_COL_ACTIONS
+        move_rows = rows[moves]
+        cols1, cols2 = np.divmod(actions[moves] - COL_COL_ACTIONS, NB_COLUMNS)
+        nb_cards = self.depth[move_rows, cols1, cols2] + 1
+        cards = self.columns[move_rows, cols1]
+        moved_rows, moved_depths = np.nonzero(COLUMN_DEPTHS < nb_cards[:, None])
+        self.set_location(move_rows[moved_rows], cards[moved_rows, moved_depths], cols2[moved_rows])
+        self.col_top[move_rows, cols2] = cards[:, 0]
+        self.col_up[move_rows, cols2] += nb_cards
+        self.pop_column(move_rows, cols1, nb_cards)
+        rewards[moves] = 5 * self.reveal(move_rows, cols1)
+
+        self.history.append(self.hash.copy())
+        return rewards
+
+    def rollouts(self, gamma, threshold):
+        """
+        Plays random actions in all the games until they are over or the discount is too small
+        :param gamma: (float) discount factor of the rewards
+        :param threshold: (float) smallest discount of a played action
+        :return: (np.array) the discounted reward of each game
+        """
+        rewards = np.zeros(self.nb_games)
+        over = self.is_won()
+        time = 0
+        while gamma ** time > threshold:
+            legal = self.legal_actions()
+            legal[over] = False
+            counts = np.count_nonzero(legal, axis=1)
+            over |= counts == 0
+            rows = np.nonzero(~over)[0]
+            if not len(rows): break
+
+            # Uniformly random legal action of each game
+            actions = np.nonzero(legal)[1]
+            first = np.cumsum(counts) - counts
+            choices = first[rows] + (self.rng.random(len(rows)) * counts[rows]).astype(int)
+            rewards[rows] += (gamma ** time) * self.play(rows, actions[choices])
+            over |= self.is_won()
+            time += 1
+
+        return rewards
@@ -27,4 +27,11 @@ class Card:
 
     def __init__(self, color, rank):
         self.color = color
-        self.rank = rank
\ No newline at end of file
+        self.rank = rank
+
+def card_index(card):
+    """
+    Retrieves the position of a card in the state of a game
+    :param card: (Card) the card
+    """
+    return COLORS.index(card.color) * len(CARDS) + card.rank - 1
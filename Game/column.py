@@ -69,6 +69,14 @@ class Column:
         self.nb_todraw -= 1
         self.add_cards([card])
 
+    def hide_card(self):
+        """
+        Hides back the last revealed card of the column
+        :return: the hidden card
+        """
+        self.nb_todraw += 1
+        return self.cards.pop()
+
     def remove_cards(self, number):
         """
         Removes a given number of cards from the column
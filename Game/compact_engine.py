@@ -0,0 +1,714 @@
+from __future__ import division
+import copy
+from Game.solitaire_engine import *
+from Game.zobrist import *
+
+# Layout of the state buffer
+NB_CARDS = 52
+# Location of each card, with the same values as the state of a Solitaire_Engine
+LOC = 0
+# Card in each slot of the sub-deck
+DECK = LOC + NB_CARDS
+DECK_LEN = DECK + NB_CARDS_SUBDECK
+# First index and number of the drawn cards of the sub-deck
+WASTE_START = DECK_LEN + 1
+WASTE_LEN = WASTE_START + 1
+# Number of face-down and face-up cards of each column
+COL_DOWN = WASTE_LEN + 1
+COL_UP = COL_DOWN + NB_COLUMNS
+# Top face-up card of each column
+COL_TOP = COL_UP + NB_COLUMNS
+# Top card of each heap
+HEAP_TOP = COL_TOP + NB_COLUMNS
+BUFFER_SIZE = HEAP_TOP + NB_HEAPS
+
+NO_CARD = 255
+NB_RANKS = len(CARDS)
+
+IN_HEAP_VALUE = NB_COLUMNS
+UNDRAWN_VALUE = NB_COLUMNS + 1
+DECK_VALUE = NB_COLUMNS + 2
+
+# String of each location value, for building state strings
+VALUE_STRINGS = [str(i) for i in range(DECK_VALUE + NB_CARDS_SUBDECK)]
+# Indexes of the red and black colors
+RED_COLORS = [COLORS.index(color) for color in REDS]
+BLACK_COLORS = [COLORS.index(color) for color in BLACKS]
+
+
+def code_card(code):
+    """
+    Builds the card of a given integer code
+    :param code: (int) the code of the card
+    """
+    return Card(COLORS[code // NB_RANKS], code % NB_RANKS + 1)
+
+
+def code_rank(code):
+    """
+    Retrieves the rank of the card of a given code
+    :param code: (int) the code of the card
+    """
+    return code % NB_RANKS + 1
+
+
+def code_red(code):
+    """
+    Checks if the card of a given code is red
+    :param code: (int) the code of the card
+    """
+    return COLORS[code // NB_RANKS] in REDS
+
+
+def pack(buffer, sub_deck, sub_deck_index, columns, nb_todraw, heaps):
+    """
+    Fills a state buffer with the cards of a game
+    :param buffer: (bytearray) the buffer to fill
+    :param sub_deck: (list (Card)) cards of the sub-deck
+    :param sub_deck_index: (list (int)) indexes of the drawn cards of the sub-deck
+    :param columns: (list (list (Card))) face-up cards of each column
+    :param nb_todraw: (list (int)) number of face-down cards of each column
+    :param heaps: (list (list (Card))) cards of each heap
+    """
+    buffer[LOC:LOC + NB_CARDS] = bytes([UNDRAWN_VALUE]) * NB_CARDS
+    for i in range(NB_CARDS_SUBDECK):
+        buffer[DECK + i] = NO_CARD
+    for i in range(len(sub_deck)):
+        buffer[DECK + i] = card_index(sub_deck[i])
+        buffer[LOC + card_index(sub_deck[i])] = DECK_VALUE + i
+    buffer[DECK_LEN] = len(sub_deck)
+    buffer[WASTE_START] = sub_deck_index[0] if sub_deck_index else 0
+    buffer[WASTE_LEN] = len(sub_deck_index)
+    for i in range(NB_COLUMNS):
+        buffer[COL_DOWN + i] = nb_todraw[i]
+        buffer[COL_UP + i] = len(columns[i])
+        buffer[COL_TOP + i] = card_index(columns[i][-1]) if columns[i] else NO_CARD
+        for card in columns[i]:
+            buffer[LOC + card_index(card)] = i
+    for i in range(NB_HEAPS):
+        buffer[HEAP_TOP + i] = card_index(heaps[i][-1]) if heaps[i] else NO_CARD
+        for card in heaps[i]:
+            buffer[LOC + card_index(card)] = IN_HEAP_VALUE
+
+
+def pack_game(game):
+    """
+    Builds the state buffer of a Solitaire_Engine
+    :param game: (Solitaire_Engine) the game
+    :return: (bytearray) the buffer
+    """
+    buffer = bytearray(BUFFER_SIZE)
+    pack(buffer, game.sub_deck, game.sub_deck_index, [column.cards for column in game.columns],
+         [column.nb_todraw for column in game.columns], [heap.cards for heap in game.heaps])
+    return buffer
+
+
+class Compact_Record:
+    """
+    Information needed to undo an action played on a Compact_Engine
+    """
+
+    def __init__(self, game, action, value):
+        """
+        Saves the state of a game before an action is played
+        :param game: (Compact_Engine) game before the action is played
+        :param action: (int) key of the played action
+        :param value: (tuple) name and arguments of the played action
+        """
+        self.action = action
+        self.value = value
+        self.buffer = bytes(game.buffer)
+        self.hash = game.hash
+        self.reward = game.reward
+        self.score = game.score
+        self.time = game.time
+        self.actions_dict = game.actions_dict
+        # Card revealed in a column by the action
+        self.revealed = None
+        # Whether the reached state was added to the set of met states
+        self.new_state = False
+
+
+class Compact_Engine:
+    """
+    Solitaire game whose state is packed in a single fixed-size buffer.
+    Face-up cards of a column always form a sequence of decreasing ranks, so a column is
+    stored as its top card and its number of face-up and face-down cards.
+    """
+
+    action_index_name = ACTION_INDEX_NAME
+    get_header = Solitaire_Engine.get_header
+
+    def __init__(self, game=None, seed=None, deal=None, auto_heap=False):
+        """
+        Creates a new Compact_Engine object
+        :param game: (Solitaire_Engine) game to pack, a new game is dealt if None
+        :param seed: (int) seed of the deal and of the cards revealed in the columns, drawn from
+                     the global generator if None
+        :param deal: (list ((int, string))) rank and color of the cards of the sub-deck followed by
+                     the face-up card of each column, dealt at random if None
+        :param auto_heap: (bool) play the safe moves to the heaps automatically after each action,
+                          taken from the packed game if any
+        """
+        self.auto_heap = auto_heap if game is None else game.auto_heap
+        if game is None:
+            # Generator of the deal and of the revealed cards
+            self.rng = new_rng(seed)
+            main_deck, sub_deck, tops = deal_cards(self.rng, deal)
+            self.buffer = bytearray(BUFFER_SIZE)
+            pack(self.buffer, sub_deck, [], [[card] for card in tops], list(range(NB_COLUMNS)),
+                 [[] for i in range(NB_HEAPS)])
+            self.reward, self.score, self.time = 0, 0, 0
+            states = []
+        else:
+            self.rng = copy.copy(game.rng)
+            self.buffer = pack_game(game)
+            self.reward, self.score, self.time = game.reward, game.score, game.time
+            states = game.states_stack
+        buffer = self.buffer
+
+        # Zobrist hash of the card locations, updated with each card move
+        self.hash = zobrist_hash(list(buffer[LOC:LOC + NB_CARDS]))
+        # Hashes of the states already met, shared with the clones until one of them changes it
+        if not states: states = [self.hash]
+        self.seen_states = set(states)
+        self.owns_states = True
+        # Actions dictionary
+        self.actions_dict = dict()
+        self.legal_actions()
+
+    def clone(self):
+        """
+        Copies the game, the buffer being the only copied data: the copy shares the generator
+        of the revealed cards, and the set of met states until one of the games changes it
+        """
+        game = Compact_Engine.__new__(Compact_Engine)
+        game.buffer = bytearray(self.buffer)
+        game.rng = self.rng
+        game.auto_heap = self.auto_heap
+        game.hash = self.hash
+        game.reward = self.reward
+        game.score = self.score
+        game.time = self.time
+        game.seen_states = self.seen_states
+        game.owns_states = self.owns_states = False
+        game.actions_dict = self.actions_dict
+        return game
+
+    def __deepcopy__(self, memo):
+        return self.clone()
+
+    def is_over(self):
+        return self.is_won() or self.is_lost()
+
+    def is_won(self):
+        """
+        Checks if the game is won.
+        """
+        for heap in range(NB_HEAPS):
+            card = self.buffer[HEAP_TOP + heap]
+            if card == NO_CARD or code_rank(card) != KING: return False
+
+        return True
+
+    def is_lost(self):
+        """
+        Checks if a game is lost.
+        """
+        return len(self.actions_dict) == 0
+
+    def get_reward(self):
+        """
+        Retrieves the result of the game
+        """
+        return self.reward
+
+    def nb_hidden(self):
+        """
+        Retrieves the number of face-down cards of the columns
+        """
+        return sum(self.buffer[COL_DOWN:COL_DOWN + NB_COLUMNS])
+
+    def column_card(self, col, depth):
+        """
+        Retrieves a face-up card of a column
+        :param col: (int) index of the column
+        :param depth: (int) position of the card from the top of the column
+        """
+        buffer = self.buffer
+        top = buffer[COL_TOP + col]
+        if depth == 0: return top
+
+        # Colors alternate along the column
+        offset = top % NB_RANKS + depth
+        colors = RED_COLORS if code_red(top) != (depth % 2 == 1) else BLACK_COLORS
+        for color in colors:
+            code = color * NB_RANKS + offset
+            if buffer[LOC + code] == col: return code
+
+    def can_add_column(self, col, card):
+        """
+        Checks if a card can be added to a column
+        :param col: (int) index of the column
+        :param card: (int) code of the card
+        """
+        top = self.buffer[COL_TOP + col]
+        if top == NO_CARD: return code_rank(card) == KING
+        if code_rank(card) != code_rank(top) - 1: return False
+
+        return code_red(card) != code_red(top)
+
+    def can_add_heap(self, heap, card):
+        """
+        Checks if a card can be added to a heap
+        :param heap: (int) index of the heap
+        :param card: (int) code of the card
+        """
+        top = self.buffer[HEAP_TOP + heap]
+        if top == NO_CARD: return code_rank(card) == ACE
+
+        return card == top + 1 and code_rank(card) != ACE
+
+    def deck_cycle(self):
+        """
+        Retrieves the index of the top card of the sub-deck after each number of draws, until a
+        top card comes back
+        """
+        return DRAW_CYCLES[self.buffer[DECK_LEN]][self.waste_index() + 1]
+
+    def waste_index(self):
+        """
+        Retrieves the index of the top drawn card of the sub-deck, -1 if no card is drawn
+        """
+        buffer = self.buffer
+        if not buffer[WASTE_LEN]: return -1
+        return buffer[WASTE_START] + buffer[WASTE_LEN] - 1
+
+    def draw(self):
+        """
+        Draw cards from the sub-deck
+        """
+        buffer = self.buffer
+        nb_cards = buffer[DECK_LEN]
+        if not nb_cards: return False
+
+        start = self.waste_index() + 1
+        if start >= nb_cards: start = 0
+        buffer[WASTE_START] = start
+        buffer[WASTE_LEN] = min(start + 3, nb_cards) - start
+
+        self.reward = 0
+
+    def pop_deck(self, nb_draw):
+        """
+        Draws a number of times and removes the top drawn card of the sub-deck
+        :param nb_draw: (int) Number of times to draw before removing the card
+        :return: the code of the removed card
+        """
+        buffer = self.buffer
+        if nb_draw:
+            # Moves are only generated for draws within the cycle of the sub-deck
+            cycle = self.deck_cycle()
+            start = cycle[nb_draw - 1] + 1
+            if start >= buffer[DECK_LEN]: start = 0
+            buffer[WASTE_START] = start
+            buffer[WASTE_LEN] = cycle[nb_draw] - start + 1
+
+        index = self.waste_index()
+        card = buffer[DECK + index]
+        nb_cards = buffer[DECK_LEN] - 1
+        for i in range(index, nb_cards):
+            buffer[DECK + i] = buffer[DECK + i + 1]
+            self.set_location(buffer[DECK + i], DECK_VALUE + i)
+        buffer[DECK + nb_cards] = NO_CARD
+        buffer[DECK_LEN] = nb_cards
+        buffer[WASTE_LEN] -= 1
+        if not buffer[WASTE_LEN]: buffer[WASTE_START] = 0
+
+        return card
+
+    def set_location(self, card, value):
+        """
+        Sets the location value of a card and updates the hash of the state
+        :param card: (int) code of the card
+        :param value: (int) the new location value of the card
+        """
+        self.hash ^= ZOBRIST[card][self.buffer[LOC + card]] ^ ZOBRIST[card][value]
+        self.buffer[LOC + card] = value
+
+    def push_column(self, col, card):
+        """
+        Puts a card on top of a column
+        :param col: (int) index of the column
+        :param card: (int) code of the card
+        """
+        buffer = self.buffer
+        self.set_location(card, col)
+        buffer[COL_TOP + col] = card
+        buffer[COL_UP + col] += 1
+
+    def pop_column(self, col, nb_cards):
+        """
+        Removes face-up cards from the top of a column, revealing a new card if needed
+        :param col: (int) index of the column
+        :param nb_cards: (int) number of cards to remove
+        :return: the codes of the removed cards, from top to bottom
+        """
+        buffer = self.buffer
+        cards = [self.column_card(col, depth) for depth in range(nb_cards)]
+        buffer[COL_UP + col] -= nb_cards
+        if buffer[COL_UP + col]:
+            buffer[COL_TOP + col] = self.column_card(col, nb_cards)
+        else:
+            buffer[COL_TOP + col] = NO_CARD
+        return cards
+
+    def reveal(self, col, key=None):
+        """
+        Reveals a new card in a column
+        :param col: (int) index of the column
+        :param key: ((int, string)) rank and color of the card to reveal, random if None
+        :return: the revealed card
+        """
+        buffer = self.buffer
+        if key is None:
+            hidden = [i for i in range(NB_CARDS) if buffer[LOC + i] == UNDRAWN_VALUE]
+            card = self.rng.choice(hidden)
+        else:
+            card = COLORS.index(key[1]) * NB_RANKS + key[0] - 1
+        buffer[COL_DOWN + col] -= 1
+        self.push_column(col, card)
+        self.reward += 5
+
+        return code_card(card)
+
+    def deck_to_heap(self, heap, nb_draw):
+        """
+        Moves the top drawn of the deck to a given heap
+        :param heap: (int) number of the heap where to move the card
+        :param nb_draw: (int) Number of times to draw before actually playing
+        """
+        card = self.pop_deck(nb_draw)
+        self.set_location(card, IN_HEAP_VALUE)
+        self.buffer[HEAP_TOP + heap] = card
+
+        self.reward = 10
+
+    def deck_to_column(self, col, nb_draw):
+        """
+        Moves the top drawn of the deck to a given column
+        :param col: (int) index of the column where to move the card
+        :param nb_draw: (int) Number of times to draw before actually playing
+        """
+        card = self.pop_deck(nb_draw)
+        self.push_column(col, card)
+
+        self.reward = 5
+
+    def column_to_heap(self, col, heap, reveal=None):
+        """
+        Moves the top card of a column to a heap
+        :param col: (int) index of the column
+        :param heap: (int) index of the heap
+        :param reveal: ((int, string)) rank and color of the card to reveal, random if None
+        :return: the card revealed in the column, if any
+        """
+        buffer = self.buffer
+        card = self.pop_column(col, 1)[0]
+        self.set_location(card, IN_HEAP_VALUE)
+        buffer[HEAP_TOP + heap] = card
+
+        self.reward = 10
+
+        if not buffer[COL_UP + col] and buffer[COL_DOWN + col]: return self.reveal(col, reveal)
+
+    def heap_to_column(self, heap, col):
+        """
+        Moves a card from a heap to a column
+        :param heap: (int) index of the heap
+        :param col: (int) index of the column
+        """
+        buffer = self.buffer
+        card = buffer[HEAP_TOP + heap]
+        buffer[HEAP_TOP + heap] = card - 1 if code_rank(card) != ACE else NO_CARD
+        self.push_column(col, card)
+
+        self.reward = -15
+
+    def column_to_column(self, col1, col2, nb_cards, reveal=None):
+        """
+        Moves a number of card from a column to another
+        :param col1: (int) index of the first column
+        :param col2: (int) index of the second column
+        :param nb_cards: (int) number of cards to move
+        :param reveal: ((int, string)) rank and color of the card to reveal, random if None
+        :return: the card revealed in the first column, if any
+        """
+        buffer = self.buffer
+        cards = self.pop_column(col1, nb_cards)
+        for card in cards:
+            self.set_location(card, col2)
+        buffer[COL_TOP + col2] = cards[0]
+        buffer[COL_UP + col2] += nb_cards
+
+        self.reward = 0
+
+        if not buffer[COL_UP + col1] and buffer[COL_DOWN + col1]: return self.reveal(col1, reveal)
+
+    def legal_actions(self):
+        """
+        Retrieves all the legal actions of the current states.
+        """
+        buffer = self.buffer
+        table = dict()
+
+        # For each configuration of the sub-deck, check possible actions
+        if buffer[DECK_LEN]:
+            for nb_draw, index in enumerate(self.deck_cycle()):
+                if index >= 0:
+                    card = buffer[DECK + index]
+                    index_action = nb_draw * NB_DECK_TARGETS
+                    values = DECK_HEAP_VALUES[nb_draw]
+                    for heap in range(NB_HEAPS):
+                        if self.can_add_heap(heap, card):
+                            table[index_action] = values[heap]
+                        index_action += 1
+                    values = DECK_COL_VALUES[nb_draw]
+                    for col in range(NB_COLUMNS):
+                        if self.can_add_column(col, card):
+                            table[index_action] = values[col]
+                        index_action += 1
+
+        index_action = COL_HEAP_KEYS
+        # Check col-heap
+        for heap in range(NB_HEAPS):
+            for col in range(NB_COLUMNS):
+                card = buffer[COL_TOP + col]
+                if card != NO_CARD and self.can_add_heap(heap, card):
+                    table[index_action] = COL_HEAP_VALUES[heap][col]
+                index_action += 1
+
+        # Check heap-col
+        for heap in range(NB_HEAPS):
+            card = buffer[HEAP_TOP + heap]
+            for col in range(NB_COLUMNS):
+                if card != NO_CARD and code_rank(card) != ACE and self.can_add_column(col, card):
+                    # A safe card would go back to its heap at once
+                    if not (self.auto_heap and self.safe_to_heap(card)) and \
+                            self.probe_state([card], col) not in self.seen_states:
+                        table[index_action] = HEAP_COL_VALUES[heap][col]
+                index_action += 1
+
+        # Check col-col, only one number of cards of a column can fit on another one
+        for col1 in range(NB_COLUMNS):
+            nb_up = buffer[COL_UP + col1]
+            top = buffer[COL_TOP + col1]
+            for col2 in range(NB_COLUMNS):
+                if col1 != col2:
+                    if nb_up:
+                        target = buffer[COL_TOP + col2]
+                        rank = code_rank(target) - 1 if target != NO_CARD else KING
+                        depth = rank - code_rank(top)
+                        if 0 <= depth < nb_up:
+                            card = self.column_card(col1, depth)
+                            if self.can_add_column(col2, card):
+                                # A revealed card leads to a state never seen before
+                                if depth + 1 == nb_up and buffer[COL_DOWN + col1]:
+                                    table[index_action] = COL_COL_VALUES[col1][col2][depth + 1]
+                                else:
+                                    cards = [self.column_card(col1, i) for i in range(depth + 1)]
+                                    if self.probe_state(cards, col2) not in self.seen_states:
+                                        table[index_action] = COL_COL_VALUES[col1][col2][depth + 1]
+                    index_action += 1
+
+        self.actions_dict = table
+        return list(table.keys())
+
+    def probe_state(self, cards, col):
+        """
+        Computes the hash of the state reached by moving cards to a column, without moving them
+        :param cards: (list (int)) codes of the cards to move
+        :param col: (int) index of the column where the cards are moved
+        """
+        probe = self.hash
+        for card in cards:
+            probe ^= ZOBRIST[card][self.buffer[LOC + card]] ^ ZOBRIST[card][col]
+        return probe
+
+    def safe_to_heap(self, card):
+        """
+        Checks if a card can go to a heap, no card could ever be put on it in a column (see safe_card)
+        :param card: (int) code of the card
+        """
+        buffer = self.buffer
+        return safe_card(code_rank(card), code_red(card),
+                         lambda rank, color: buffer[LOC + color * NB_RANKS + rank - 1] == IN_HEAP_VALUE)
+
+    def auto_move(self):
+        """
+        Retrieves a safe move to a heap of the drawn card or of the top card of a column,
+        revealing no card so that the moves played automatically never involve randomness
+        :return: (tuple) opcode and arguments of the move, None if there is none
+        """
+        buffer = self.buffer
+        if buffer[WASTE_LEN]:
+            card = buffer[DECK + self.waste_index()]
+            if self.safe_to_heap(card):
+                for heap in range(NB_HEAPS):
+                    if self.can_add_heap(heap, card): return DECK_HEAP_VALUES[0][heap]
+        for col in range(NB_COLUMNS):
+            nb_up = buffer[COL_UP + col]
+            if nb_up > 1 or (nb_up and not buffer[COL_DOWN + col]):
+                card = buffer[COL_TOP + col]
+                if self.safe_to_heap(card):
+                    for heap in range(NB_HEAPS):
+                        if self.can_add_heap(heap, card): return COL_HEAP_VALUES[heap][col]
+        return None
+
+    def play_auto_moves(self):
+        """
+        Plays the safe moves to the heaps, their rewards being added to the reward of the action
+        :return: (int) the number of moves played
+        """
+        reward = self.reward
+        nb_moves = 0
+        value = self.auto_move()
+        while value is not None:
+            opcode, args = value
+            if opcode == DECK_HEAP: self.deck_to_heap(args[0], args[1])
+            else: self.column_to_heap(args[0], args[1])
+            reward += self.reward
+            nb_moves += 1
+            value = self.auto_move()
+        self.reward = reward
+        return nb_moves
+
+    # Moves of each opcode, saving in the record the revealed card
+    def play_draw(self, record, args, reveal):
+        self.draw()
+
+    def play_deck_to_heap(self, record, args, reveal):
+        self.deck_to_heap(args[0], args[1])
+
+    def play_deck_to_column(self, record, args, reveal):
+        self.deck_to_column(args[0], args[1])
+
+    def play_column_to_heap(self, record, args, reveal):
+        record.revealed = self.column_to_heap(args[0], args[1], reveal)
+
+    def play_heap_to_column(self, record, args, reveal):
+        self.heap_to_column(args[0], args[1])
+
+    def play_column_to_column(self, record, args, reveal):
+        record.revealed = self.column_to_column(args[0], args[1], args[2], reveal)
+
+    # Method playing each opcode
+    play_moves = (play_draw, play_deck_to_heap, play_deck_to_column, play_column_to_heap,
+                  play_heap_to_column, play_column_to_column)
+
+    def play(self, action, reveal=None, legal=True):
+        """
+        Plays an action
+        :param action: (int) key of the action to play
+        :param reveal: ((int, string)) rank and color of the card to reveal, random if None
+        :param legal: (bool) compute the legal actions of the reached state, left to a later call
+                      of legal_actions if False, before the state is added to the met states
+        :return: (Compact_Record) the information needed to undo the action
+        """
+        value = self.actions_dict[action]
+        record = Compact_Record(self, action, value)
+        self.play_moves[value[0]](self, record, value[1], reveal)
+        nb_auto_moves = self.play_auto_moves() if self.auto_heap else 0
+        if legal: self.legal_actions()
+
+        # Score updates
+        self.score += self.reward
+        self.time += 1
+        # Stack update
+        if (value[0] != DRAW or nb_auto_moves) and self.hash not in self.seen_states:
+            self.own_states()
+            self.seen_states.add(self.hash)
+            record.new_state = True
+
+        return record
+
+    def own_states(self):
+        """
+        Copies the set of met states if it is shared with a clone, before it is changed
+        """
+        if not self.owns_states:
+            self.seen_states = set(self.seen_states)
+            self.owns_states = True
+
+    def undo(self, record):
+        """
+        Undoes the last played action
+        :param record: (Compact_Record) record returned when the action was played
+        """
+        if record.new_state:
+            self.own_states()
+            self.seen_states.remove(self.hash)
+        self.buffer[:] = record.buffer
+        self.hash = record.hash
+        self.actions_dict = record.actions_dict
+        self.reward = record.reward
+        self.score = record.score
+        self.time = record.time
+
+    def chance_action(self, action):
+        """
+        Checks if an action involves randomness, i.e. if it reveals a face-down card of a column.
+        :param action: The action to perform
+        """
+        opcode, args = self.actions_dict[action]
+        if opcode == COL_HEAP: col, nb_cards = args[0], 1
+        elif opcode == COL_COL: col, nb_cards = args[0], args[2]
+        else: return False
+
+        return self.buffer[COL_UP + col] == nb_cards and self.buffer[COL_DOWN + col] > 0
+
+    def get_state(self):
+        """
+        Provides an aggregation of the state of the game.
+        """
+        state = list(self.buffer[LOC:LOC + NB_CARDS])
+        return state, ''.join(VALUE_STRINGS[x] for x in state)
+
+    def position_key(self):
+        """
+        Retrieves a key of the position: card locations, drawn cards and face-down cards.
+        """
+        return (self.hash, bytes(self.buffer[WASTE_START:COL_UP]))
+
+    def render(self):
+        """
+        Renders game in the console
+        """
+        buffer = self.buffer
+        print("State:")
+        print("Draw deck:")
+        string = str(buffer[DECK_LEN])+" cards - "+\
+                 " ".join(str(buffer[WASTE_START] + i) for i in range(buffer[WASTE_LEN]))
+        if buffer[WASTE_LEN]:
+            card = code_card(buffer[DECK + self.waste_index()])
+            string += " - "+str(card.rank)+card.color
+        print(string)
+        print("Heaps:")
+        string = ""
+        for heap in range(NB_HEAPS):
+            if buffer[HEAP_TOP + heap] != NO_CARD:
+                card = code_card(buffer[HEAP_TOP + heap])
+                string += str(card.rank)+card.color+" "
+            else:
+                string += "-1 "
+        print(string)
+        print("Columns:")
+        for col in range(NB_COLUMNS):
+            string = ""
+            string += ("? " * buffer[COL_DOWN + col])
+            for depth in reversed(range(buffer[COL_UP + col])):
+                card = code_card(self.column_card(col, depth))
+                string += str(card.rank)+card.color+" "
+            print(string)
+        print("Score")
+        print(str(self.score))
@@ -1,16 +1,57 @@
 import random as rd
 from Game.card import *
 
+
+def new_rng(seed=None):
+    """
+    Creates a random generator
+    :param seed: (int) seed of the generator, drawn from the global generator if None
+    :return: the random.Random object
+    """
+    if seed is None: seed = rd.getrandbits(64)
+    return rd.Random(seed)
+
+
 class Deck:
 
-    def __init__(self):
+    def __init__(self, rng=rd):
+        """
+        Creates a new shuffled deck
+        :param rng: (random.Random) generator shuffling the deck
+        """
         self.cards = []
         for color in COLORS:
             for rank in CARDS:
                 self.cards.append(Card(color, rank))
-        rd.shuffle(self.cards)
+        rng.shuffle(self.cards)
 
-    def draw(self, shuffle=False):
+    def draw(self, shuffle=False, rng=rd):
+        """
+        Removes a card from the deck
+        :param shuffle: (bool) remove a random card instead of the last one
+        :param rng: (random.Random) generator choosing the random card
+        """
         if shuffle:
-            rd.shuffle(self.cards)
-        return self.cards.pop()
\ No newline at end of file
+            # The card drawn does not depend on the order of the deck, which undone moves change
+            card = rng.choice(sorted(self.cards, key=card_index))
+            self.cards.remove(card)
+            return card
+        return self.cards.pop()
+
+    def take(self, rank, color):
+        """
+        Removes a given card from the deck
+        :param rank: (int) rank of the card
+        :param color: (string) color of the card
+        """
+        for i in range(len(self.cards)):
+            card = self.cards[i]
+            if card.rank == rank and card.color == color:
+                return self.cards.pop(i)
+
+    def put_back(self, card):
+        """
+        Puts a card back in the deck
+        :param card: (Card) card to put back
+        """
+        self.cards.append(card)
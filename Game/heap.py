@@ -10,7 +10,7 @@ class Heap:
         """
         Checks if the heap is complete
         """
-        return self.cards[-1] == KING if self.cards else False
+        return self.cards[-1].rank == KING if self.cards else False
 
     def same_color(self, card1, card2):
         """
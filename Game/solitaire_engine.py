@@ -1,8 +1,8 @@
 from __future__ import division
-import copy
 from Game.deck import *
 from Game.column import *
 from Game.heap import *
+from Game.zobrist import *
 
 NB_CARDS_SUBDECK = 24
 NB_HEAPS = 4
@@ -14,31 +14,181 @@ IN_COL = 'col'
 UNDRAWN = 'undraw'
 
 ACTIONS = ['draw', 'deck-heap', 'deck-col', 'col-heap', 'heap-col', 'col-col']
+# Opcode of each kind of action, index of its name in ACTIONS
+DRAW, DECK_HEAP, DECK_COL, COL_HEAP, HEAP_COL, COL_COL = range(len(ACTIONS))
+
+# State value of each card location
+STATE_DICT = dict()
+for i in range(NB_COLUMNS):
+    STATE_DICT[IN_COL + str(i)] = i
+STATE_DICT[IN_HEAP] = NB_COLUMNS
+STATE_DICT[UNDRAWN] = NB_COLUMNS + 1
+for i in range(NB_CARDS_SUBDECK):
+    STATE_DICT[IN_DECK + str(i)] = NB_COLUMNS + 2 + i
+
+# Layout of the action keys: deck moves for each number of draws, then col-heap, heap-col
+# and col-col moves
+NB_DECK_TARGETS = NB_HEAPS + NB_COLUMNS
+COL_HEAP_KEYS = int(NB_CARDS_SUBDECK/3 +1) * NB_DECK_TARGETS
+HEAP_COL_KEYS = COL_HEAP_KEYS + NB_HEAPS * NB_COLUMNS
+COL_COL_KEYS = HEAP_COL_KEYS + NB_HEAPS * NB_COLUMNS
+
+# Decoded actions, as an opcode and a tuple of arguments, shared by all the games
+DECK_HEAP_VALUES = [[(DECK_HEAP, (heap, nb_draw)) for heap in range(NB_HEAPS)]
+                    for nb_draw in range(NB_CARDS_SUBDECK + 1)]
+DECK_COL_VALUES = [[(DECK_COL, (col, nb_draw)) for col in range(NB_COLUMNS)]
+                   for nb_draw in range(NB_CARDS_SUBDECK + 1)]
+COL_HEAP_VALUES = [[(COL_HEAP, (col, heap)) for col in range(NB_COLUMNS)] for heap in range(NB_HEAPS)]
+HEAP_COL_VALUES = [[(HEAP_COL, (heap, col)) for col in range(NB_COLUMNS)] for heap in range(NB_HEAPS)]
+COL_COL_VALUES = [[[(COL_COL, (col1, col2, nb_cards)) for nb_cards in range(len(CARDS) + 1)]
+                   for col2 in range(NB_COLUMNS)] for col1 in range(NB_COLUMNS)]
+
+
+def draw_cycle(nb_cards, top):
+    """
+    Computes the top drawn card of a sub-deck after each number of draws of three cards, until
+    a top card comes back
+    :param nb_cards: (int) number of cards of the sub-deck
+    :param top: (int) index of the current top drawn card, -1 if no card is drawn
+    :return: (tuple (int)) index of the top drawn card after 0, 1, 2... draws
+    """
+    if not nb_cards: return (top,)
+    last = nb_cards - 1
+    first = min(3, nb_cards) - 1
+    # Draws go three cards further until the end of the sub-deck, then start over from its
+    # beginning until a card already reached or the end of the sub-deck
+    cycle = [top] + list(range(top + 3, last, 3))
+    if top != last: cycle.append(last)
+    if top >= 0:
+        end = top if top >= first and (top - first) % 3 == 0 else last
+        cycle += range(first, end, 3)
+    return tuple(cycle)
+
+
+# Top drawn card after each number of draws, for each number of cards of the sub-deck and
+# index of the top drawn card shifted by one
+DRAW_CYCLES = [[draw_cycle(nb_cards, top) for top in range(-1, nb_cards)]
+               for nb_cards in range(NB_CARDS_SUBDECK + 1)]
+
+# Name of each action key
+ACTION_NAMES = []
+for nb_draw in range(int(NB_CARDS_SUBDECK/3)+1):
+    for i in range(NB_HEAPS):
+        ACTION_NAMES.append('deck-to-heap' + str(i) + "-" + str(nb_draw) + "draws")
+    for i in range(NB_COLUMNS):
+        ACTION_NAMES.append('deck-to-col' + str(i) + "-" + str(nb_draw) + "draws")
+for i in range(NB_HEAPS):
+    for j in range(NB_COLUMNS):
+        ACTION_NAMES.append('col' + str(j) + '-to-heap' + str(i))
+for i in range(NB_HEAPS):
+    for j in range(NB_COLUMNS):
+        ACTION_NAMES.append('heap' + str(i) + '-to-col' + str(j))
+for i in range(NB_COLUMNS):
+    for j in range(NB_COLUMNS):
+        if i != j:
+            ACTION_NAMES.append('col' + str(i) + '-to-col' + str(j))
+ACTION_INDEX_NAME = dict(enumerate(ACTION_NAMES))
+
+def safe_card(rank, red, in_heap):
+    """
+    Checks if a card is safe to move to a heap, the cards that could be stacked on it in a column
+    being in the heaps: twos, whose aces go to the heaps, and cards whose cards of the other color
+    and of the previous rank and whose cards of their color and two ranks lower are in the heaps,
+    so that a card of the previous rank would never come back down on it to hold one of them
+    :param rank: (int) rank of the card
+    :param red: (bool) whether the card is red
+    :param in_heap: (function) checks if the card of a rank and of an index in COLORS is in a heap
+    """
+    if rank <= TWO: return True
+    for color in range(len(COLORS)):
+        lower = rank - 2 if (COLORS[color] in REDS) == red else rank - 1
+        if not in_heap(lower, color): return False
+    return True
+
+# Columns of the data file of a Solitaire game
+HEADER = [str(rank) + color for color in COLORS for rank in CARDS] + ACTION_NAMES + ['reward']
+
+class Move_Record:
+    """
+    Information needed to undo an action played on a Solitaire_Engine
+    """
+
+    def __init__(self, game, action, value):
+        """
+        Saves the parts of a game that an action may change
+        :param game: (Solitaire_Engine) game before the action is played
+        :param action: (int) key of the played action
+        :param value: (tuple) name and arguments of the played action
+        """
+        self.action = action
+        self.value = value
+        self.reward = game.reward
+        self.score = game.score
+        self.time = game.time
+        self.actions_dict = game.actions_dict
+        self.sub_deck_index = list(game.sub_deck_index)
+        # Index in the sub-deck of the card moved from the deck
+        self.deck_index = -1
+        # Card revealed in a column by the action
+        self.revealed = None
+        # Whether the reached state was added to the set of met states
+        self.new_state = False
+        # Records of the safe moves to the heaps played automatically after the action
+        self.auto_moves = ()
+
+def deal_cards(rng, deal=None):
+    """
+    Deals the cards of a new game
+    :param rng: (random.Random) generator shuffling the deck
+    :param deal: (list ((int, string))) rank and color of the cards of the sub-deck followed by
+                 the face-up card of each column, random if None
+    :return: the deck of the hidden cards, the sub-deck and the face-up card of each column
+    """
+    main_deck = Deck(rng)
+    if deal is None:
+        cards = [main_deck.draw() for i in range(NB_CARDS_SUBDECK + NB_COLUMNS)]
+    else:
+        if len(deal) != NB_CARDS_SUBDECK + NB_COLUMNS or len(set(deal)) != len(deal):
+            raise ValueError("A deal is made of " + str(NB_CARDS_SUBDECK + NB_COLUMNS) + " different cards")
+        cards = [main_deck.take(rank, color) for rank, color in deal]
+        if None in cards: raise ValueError("Unknown card in the deal")
+    return main_deck, cards[:NB_CARDS_SUBDECK], cards[NB_CARDS_SUBDECK:]
 
 class Solitaire_Engine:
 
-    def __init__(self):
-        # State values dictionary
-        self.state_dict = dict()
-        for i in range(33):
-            if i <= 6:
-                self.state_dict[IN_COL + str(i)] = i
-            elif i == 7:
-                self.state_dict[IN_HEAP] = i
-            elif i == 8:
-                self.state_dict[UNDRAWN] = i
-            else:
-                self.state_dict[IN_DECK + str(i-9)] = i
+    # Tables shared by all the games
+    state_dict = STATE_DICT
+    action_index_name = ACTION_INDEX_NAME
+
+    def __init__(self, seed=None, deal=None, auto_heap=False):
+        """
+        Creates a new Solitaire_Engine object
+        :param seed: (int) seed of the deal and of the cards revealed in the columns, drawn from
+                     the global generator if None
+        :param deal: (list ((int, string))) rank and color of the cards of the sub-deck followed by
+                     the face-up card of each column, dealt at random if None
+        :param auto_heap: (bool) play the safe moves to the heaps automatically after each action
+        """
+        # Safe moves to the heaps are part of the action after which they are played
+        self.auto_heap = auto_heap
         # State information for each card
         self.cards_state = dict()
+        # State value of each card in the order of the state, kept for encoding the game at once
+        self.locations = bytearray([self.state_dict[UNDRAWN]]) * NB_ZOBRIST_CARDS
+        # Zobrist hash of the state, updated with each card move
+        self.hash = zobrist_hash([self.state_dict[UNDRAWN]] * NB_ZOBRIST_CARDS)
+        # Generator of the deal and of the revealed cards
+        self.rng = new_rng(seed)
         # Main deck where all cards are drawn
-        self.main_deck = Deck()
+        self.main_deck, sub_deck, tops = deal_cards(self.rng, deal)
+        # Dealt cards, from which the same game can be dealt again
+        self.deal = [(card.rank, card.color) for card in sub_deck + tops]
         # Upper-left sub-deck
         self.sub_deck = []
         self.sub_deck_index = []
         for i in range(NB_CARDS_SUBDECK):
-            card = self.main_deck.draw()
-            self.cards_state[(card.rank, card.color)] = self.state_dict[IN_DECK + str(i)]
+            card = sub_deck[i]
+            self.set_card_state(card, self.state_dict[IN_DECK + str(i)])
             self.sub_deck.append(card)
         # Heaps init
         self.heaps = []
@@ -48,21 +198,19 @@ class Solitaire_Engine:
         self.columns = []
         for i in range(NB_COLUMNS):
             self.columns.append(Column(i))
-            card = self.main_deck.draw()
-            self.cards_state[(card.rank, card.color)] = self.state_dict[IN_COL + str(i)]
+            card = tops[i]
+            self.set_card_state(card, self.state_dict[IN_COL + str(i)])
             self.columns[i].reveal_card(card)
         # Reward for scoring
         self.reward = 0
         self.time = 0
         self.score = 0
-        # States stack for avoiding cycles
-        _, state = self.get_state()
-        self.states_stack = [state]
+        # States stack for avoiding cycles, as hashes
+        self.states_stack = [self.hash]
+        self.states_set = {self.hash}
         # Actions dictionary
         self.actions_dict = dict()
         self.legal_actions()
-        self.action_index_name = dict()
-        self.index_action_to_name()
 
     def is_over(self):
         return self.is_won() or self.is_lost()
@@ -115,23 +263,71 @@ class Solitaire_Engine:
 
         self.reward = 0
 
+    def next_draw_index(self, index):
+        """
+        Retrieves the index of the top card of the sub-deck after one draw
+        :param index: (int) index of the current top card, -1 if no card is drawn
+        """
+        nb_cards = len(self.sub_deck)
+        if index + 1 >= nb_cards: return min(3, nb_cards) - 1
+        return min(index + 4, nb_cards) - 1
+
+    def deck_cycle(self):
+        """
+        Retrieves the index of the top card of the sub-deck after each number of draws, until a
+        top card comes back
+        """
+        top = self.sub_deck_index[-1] if self.sub_deck_index else -1
+        return DRAW_CYCLES[len(self.sub_deck)][top + 1]
+
+    def deck_index(self, nb_draw):
+        """
+        Retrieves the index of the top card of the sub-deck after a number of draws, without drawing
+        :param nb_draw: (int) Number of times to draw
+        """
+        if not self.can_draw(): return -1
+
+        cycle = self.deck_cycle()
+        if nb_draw < len(cycle): return cycle[nb_draw]
+        # Further draws go round the cycle again
+        index = cycle[-1]
+        for i in range(nb_draw - len(cycle) + 1):
+            index = self.next_draw_index(index)
+
+        return index
+
+    def draw_times(self, nb_draw):
+        """
+        Draws a number of times from the sub-deck at once
+        :param nb_draw: (int) Number of times to draw
+        """
+        if not nb_draw or not self.can_draw(): return
+
+        start = self.deck_index(nb_draw - 1) + 1
+        if start >= len(self.sub_deck): start = 0
+        self.sub_deck_index = list(range(start, self.deck_index(nb_draw) + 1))
+        self.reward = 0
+
+    def deck_card(self, nb_draw):
+        """
+        Retrieves the top card of the sub-deck after a number of draws, without drawing
+        :param nb_draw: (int) Number of times to draw
+        """
+        index = self.deck_index(nb_draw)
+        if index < 0: return None
+
+        return self.sub_deck[index]
+
     def can_deck_to_heap(self, heap, nb_draw):
         """
         Checks if the card from the deck can be added to a heap
         :param heap: (int) Number of the heap where to move the card
         :param nb_draw: (int) Number of times to draw before actually playing
         """
-        game_copy = copy.deepcopy(self)
-        if not game_copy.can_draw(): return False
-        for i in range(nb_draw):
-            game_copy.draw()
+        card = self.deck_card(nb_draw)
+        if card is None: return False
 
-        if not game_copy.sub_deck_index: return False
-
-        index = game_copy.sub_deck_index[-1]
-        card = game_copy.sub_deck[index]
-
-        if not game_copy.heaps[heap].can_add(card): return False
+        if not self.heaps[heap].can_add(card): return False
 
         return True
 
@@ -143,18 +339,17 @@ class Solitaire_Engine:
         """
         if not self.can_deck_to_heap(heap, nb_draw): return False
 
-        for i in range(nb_draw):
-            self.draw()
+        self.draw_times(nb_draw)
 
         index_heap = self.sub_deck_index.pop()
         card = self.sub_deck.pop(index_heap)
         self.heaps[heap].add_card(card)
 
         # State update for moved card
-        self.cards_state[(card.rank, card.color)] = self.state_dict[IN_HEAP]
+        self.set_card_state(card, self.state_dict[IN_HEAP])
         while index_heap < len(self.sub_deck):
             card = self.sub_deck[index_heap]
-            self.cards_state[(card.rank, card.color)] = self.state_dict[IN_DECK + str(index_heap)]
+            self.set_card_state(card, self.state_dict[IN_DECK + str(index_heap)])
             index_heap += 1
 
         # Reward update
@@ -166,17 +361,10 @@ class Solitaire_Engine:
         :param heap: (int) Number of the column where to move the card
         :param nb_draw: (int) Number of times to draw before actually playing
         """
-        game_copy = copy.deepcopy(self)
-        if not game_copy.can_draw(): return False
-        for i in range(nb_draw):
-            game_copy.draw()
+        card = self.deck_card(nb_draw)
+        if card is None: return False
 
-        if not game_copy.sub_deck_index: return False
-
-        index = game_copy.sub_deck_index[-1]
-        card = game_copy.sub_deck[index]
-
-        if not game_copy.columns[col].can_add(card): return False
+        if not self.columns[col].can_add(card): return False
 
         return True
 
@@ -187,18 +375,17 @@ class Solitaire_Engine:
         :param nb_draw: (int) Number of times to draw before actually playing
         """
         if not self.can_deck_to_column(col, nb_draw): return
-        for i in range(nb_draw):
-            self.draw()
+        self.draw_times(nb_draw)
 
         index_heap = self.sub_deck_index.pop()
         card = self.sub_deck.pop(index_heap)
         self.columns[col].add_cards([card])
 
         # State update for moved card
-        self.cards_state[(card.rank, card.color)] = self.state_dict[IN_COL + str(col)]
+        self.set_card_state(card, self.state_dict[IN_COL + str(col)])
         while index_heap < len(self.sub_deck):
             card = self.sub_deck[index_heap]
-            self.cards_state[(card.rank, card.color)] = self.state_dict[IN_DECK + str(index_heap)]
+            self.set_card_state(card, self.state_dict[IN_DECK + str(index_heap)])
             index_heap += 1
 
         # Reward update
@@ -217,11 +404,13 @@ class Solitaire_Engine:
 
         return True
 
-    def column_to_heap(self, col, heap):
+    def column_to_heap(self, col, heap, reveal=None):
         """
         Moves the top card of a column to a heap
         :param col: (int) index of the column
         :param heap: (int) index of the heap
+        :param reveal: ((int, string)) rank and color of the card to reveal, random if None
+        :return: the card revealed in the column, if any
         """
         column = self.columns[col]
         if not self.can_column_to_heap(col, heap): return
@@ -229,17 +418,13 @@ class Solitaire_Engine:
         cards = column.remove_cards(1)
         self.heaps[heap].add_card(cards[0])
         # State update for moved card
-        self.cards_state[(cards[0].rank, cards[0].color)] = self.state_dict[IN_HEAP]
+        self.set_card_state(cards[0], self.state_dict[IN_HEAP])
 
         # Reward update
         self.reward = 10
 
         # Check if a new card has to be revealed
-        if column.need_reveal():
-            card = self.main_deck.draw(True)
-            self.cards_state[(card.rank, card.color)] = self.state_dict[IN_COL + str(col)]
-            column.reveal_card(card)
-            self.reward += 5
+        if column.need_reveal(): return self.reveal(col, reveal)
 
     def can_heap_to_column(self, heap, col):
         """
@@ -265,7 +450,7 @@ class Solitaire_Engine:
         card = self.heaps[heap].remove_card()
         self.columns[col].add_cards([card])
         # State update for moved card
-        self.cards_state[(card.rank, card.color)] = self.state_dict[IN_COL + str(col)]
+        self.set_card_state(card, self.state_dict[IN_COL + str(col)])
 
         # Reward update
         self.reward = -15
@@ -274,193 +459,331 @@ class Solitaire_Engine:
 
         if not self.columns[col1].can_remove(nb_cards): return False
 
-        column_copy = copy.deepcopy(self.columns[col1])
-        cards = column_copy.remove_cards(nb_cards)
-        if not self.columns[col2].can_add(cards[0]): return False
+        card = self.columns[col1].cards[-nb_cards]
+        if not self.columns[col2].can_add(card): return False
 
         return True
 
-    def column_to_column(self, col1, col2, nb_cards):
+    def column_to_column(self, col1, col2, nb_cards, reveal=None):
         """
         Moves a number of card from a column to another
         :param col1: (int) index of the first column
         :param col2: (int) index of the second column
         :param nb_cards: (int) number of cards to move
+        :param reveal: ((int, string)) rank and color of the card to reveal, random if None
+        :return: the card revealed in the first column, if any
         """
         column = self.columns[col1]
         cards = column.remove_cards(nb_cards)
         self.columns[col2].add_cards(cards)
         # State update for moved cards
         for card in cards:
-            self.cards_state[(card.rank, card.color)] = self.state_dict[IN_COL + str(col2)]
+            self.set_card_state(card, self.state_dict[IN_COL + str(col2)])
 
         self.reward = 0
 
         # Check if a new card has to be revealed
-        if column.need_reveal():
-            card = self.main_deck.draw(True)
-            self.cards_state[(card.rank, card.color)] = self.state_dict[IN_COL + str(col1)]
-            column.reveal_card(card)
-            self.reward += 5
+        if column.need_reveal(): return self.reveal(col1, reveal)
+
+    def reveal(self, col, key=None):
+        """
+        Reveals a new card in a column
+        :param col: (int) index of the column
+        :param key: ((int, string)) rank and color of the card to reveal, random if None
+        :return: the revealed card
+        """
+        if key is None:
+            card = self.main_deck.draw(True, self.rng)
+        else:
+            card = self.main_deck.take(key[0], key[1])
+        self.set_card_state(card, self.state_dict[IN_COL + str(col)])
+        self.columns[col].reveal_card(card)
+        self.reward += 5
+
+        return card
+
+    def hide(self, col):
+        """
+        Puts back among the hidden cards the card revealed last in a column
+        :param col: (int) index of the column
+        """
+        card = self.columns[col].hide_card()
+        self.set_card_state(card, self.state_dict[UNDRAWN])
+        del self.cards_state[(card.rank, card.color)]
+        self.main_deck.put_back(card)
+
+    def set_card_state(self, card, value):
+        """
+        Sets the state value of a card and updates the hash and the locations of the state
+        :param card: (Card) the card
+        :param value: (int) the new state value of the card
+        """
+        key = (card.rank, card.color)
+        index = card_index(card)
+        self.hash ^= ZOBRIST[index][self.cards_state.get(key, self.state_dict[UNDRAWN])] ^ \
+                     ZOBRIST[index][value]
+        self.cards_state[key] = value
+        self.locations[index] = value
 
     def legal_actions(self):
         """
         Retrieves all the legal actions of the current states.
         """
-        index_action = 0
-        self.actions_dict.clear()
-        table = self.actions_dict
+        table = dict()
 
-        cards_list = []
-        nb_draw = 0
-        game_copy = copy.deepcopy(self)
-        if game_copy.sub_deck_index:
-            card = game_copy.sub_deck[game_copy.sub_deck_index[-1]]
-            cards_list.append(card)
         # For each configuration of the sub-deck, check possible actions
-        if game_copy.sub_deck:
-            while True:
-                # Check deck-heap
-                for heap in range(NB_HEAPS):
-                    if game_copy.can_deck_to_heap(heap, 0):
-                        table[index_action] = (ACTIONS[1], [heap, nb_draw])
-                    index_action += 1
-
-                # Check deck-column
-                for col in range(NB_COLUMNS):
-                    if game_copy.can_deck_to_column(col, 0):
-                        table[index_action] = (ACTIONS[2], [col, nb_draw])
-                    index_action += 1
-
-                # Update sub-deck
-                game_copy.draw()
-                card = game_copy.sub_deck[game_copy.sub_deck_index[-1]]
-                if card in cards_list: break
-                cards_list.append(card)
-                nb_draw += 1
-
-        index_action = int(NB_CARDS_SUBDECK/3 +1) * NB_HEAPS + int(NB_CARDS_SUBDECK/3 +1) * NB_COLUMNS
+        if self.sub_deck:
+            for nb_draw, index in enumerate(self.deck_cycle()):
+                if index >= 0:
+                    card = self.sub_deck[index]
+                    index_action = nb_draw * NB_DECK_TARGETS
+                    # Check deck-heap
+                    values = DECK_HEAP_VALUES[nb_draw]
+                    for heap in range(NB_HEAPS):
+                        if self.heaps[heap].can_add(card):
+                            table[index_action] = values[heap]
+                        index_action += 1
+                    # Check deck-column
+                    values = DECK_COL_VALUES[nb_draw]
+                    for col in range(NB_COLUMNS):
+                        if self.columns[col].can_add(card):
+                            table[index_action] = values[col]
+                        index_action += 1
+
+        index_action = COL_HEAP_KEYS
         # Check col-heap
         for heap in range(NB_HEAPS):
             for col1 in range(NB_COLUMNS):
                 if self.can_column_to_heap(col1, heap):
-                    table[index_action] = (ACTIONS[3], [col1, heap])
+                    table[index_action] = COL_HEAP_VALUES[heap][col1]
                 index_action += 1
 
         # Check heap-col
         for heap in range(NB_HEAPS):
             for col1 in range(NB_COLUMNS):
                 if self.can_heap_to_column(heap, col1):
-                    game_copy = copy.deepcopy(self)
-                    game_copy.heap_to_column(heap, col1)
-                    _, state = game_copy.get_state()
-                    if state not in self.states_stack:
-                        table[index_action] = (ACTIONS[4], [heap, col1])
+                    card = self.heaps[heap].cards[-1]
+                    # A safe card would go back to its heap at once
+                    if not (self.auto_heap and self.safe_to_heap(card)) and \
+                            self.probe_state([card], col1) not in self.states_set:
+                        table[index_action] = HEAP_COL_VALUES[heap][col1]
                 index_action += 1
 
         # Check col-col
         for col1 in range(NB_COLUMNS):
+                column = self.columns[col1]
                 for col2 in range(NB_COLUMNS):
                     if col1 != col2:
-                        max_cards = len(self.columns[col1].cards)
+                        max_cards = len(column.cards)
                         max_nb_cards = -1
                         # Choose action with the most cards
                         for nb_cards in range(1, max_cards+1):
                             if self.can_column_to_column(col1, col2, nb_cards):
-                                game_copy = copy.deepcopy(self)
-                                game_copy.column_to_column(col1, col2, nb_cards)
-                                _, state = game_copy.get_state()
-                                if state not in self.states_stack:
+                                # A revealed card leads to a state never seen before
+                                if nb_cards == max_cards and column.nb_todraw > 0:
+                                    max_nb_cards = nb_cards
+                                elif self.probe_state(column.cards[-nb_cards:], col2) \
+                                        not in self.states_set:
                                     max_nb_cards = nb_cards
                         if max_nb_cards > -1:
-                            table[index_action] = (ACTIONS[5],
-                                                   [col1, col2, max_nb_cards])
+                            table[index_action] = COL_COL_VALUES[col1][col2][max_nb_cards]
                         index_action += 1
 
-        return list(self.actions_dict.keys())
+        self.actions_dict = table
+        return list(table.keys())
 
-    def index_action_to_name(self):
+    def probe_state(self, cards, col):
         """
-        Set the dictionary for the action names
+        Computes the hash of the state reached by moving cards to a column, without moving them
+        :param cards: (list (Card)) cards to move
+        :param col: (int) index of the column where the cards are moved
         """
-        index = 0
-        for nb_draw in range(int(NB_CARDS_SUBDECK/3)+1):
-            for i in range(NB_HEAPS):
-                self.action_index_name[index] = 'deck-to-heap'+ str(i) + "-"+ str(nb_draw) + "draws"
-                index += 1
-            for i in range(NB_COLUMNS):
-                self.action_index_name[index] = 'deck-to-col' + str(i) + "-"+ str(nb_draw) + "draws"
-                index += 1
-        for i in range(NB_HEAPS):
-            for j in range(NB_COLUMNS):
-                self.action_index_name[index] = 'col'+ str(j) + '-to-heap' + str(i)
-                index += 1
-        for i in range(NB_HEAPS):
-            for j in range(NB_COLUMNS):
-                self.action_index_name[index] = 'heap' + str(i) + '-to-col' + str(j)
-                index += 1
-        for i in range(NB_COLUMNS):
-            for j in range(NB_COLUMNS):
-                if i != j:
-                    self.action_index_name[index] = 'col' + str(i) +\
-                                                    '-to-col' + str(j)
-                    index += 1
+        probe = self.hash
+        value = self.state_dict[IN_COL + str(col)]
+        for card in cards:
+            index = card_index(card)
+            probe ^= ZOBRIST[index][self.cards_state[(card.rank, card.color)]] ^ ZOBRIST[index][value]
+        return probe
+
+    def safe_to_heap(self, card):
+        """
+        Checks if a card can go to a heap, no card could ever be put on it in a column (see safe_card)
+        :param card: (Card) the card
+        """
+        cards_state = self.cards_state
+        in_heap = self.state_dict[IN_HEAP]
+        return safe_card(card.rank, card.color in REDS,
+                         lambda rank, color: cards_state.get((rank, COLORS[color])) == in_heap)
+
+    def auto_move(self):
+        """
+        Retrieves a safe move to a heap of the drawn card or of the top card of a column,
+        revealing no card so that the moves played automatically never involve randomness
+        :return: (tuple) opcode and arguments of the move, None if there is none
+        """
+        if self.sub_deck_index:
+            card = self.sub_deck[self.sub_deck_index[-1]]
+            if self.safe_to_heap(card):
+                for heap in range(NB_HEAPS):
+                    if self.heaps[heap].can_add(card): return DECK_HEAP_VALUES[0][heap]
+        for col in range(NB_COLUMNS):
+            column = self.columns[col]
+            if len(column.cards) > 1 or (column.cards and not column.nb_todraw):
+                card = column.cards[-1]
+                if self.safe_to_heap(card):
+                    for heap in range(NB_HEAPS):
+                        if self.heaps[heap].can_add(card): return COL_HEAP_VALUES[heap][col]
+        return None
+
+    def play_auto_moves(self, record):
+        """
+        Plays the safe moves to the heaps, their rewards being added to the reward of the action
+        :param record: (Move_Record) record of the action, where the moves are saved
+        """
+        reward = self.reward
+        auto_moves = []
+        value = self.auto_move()
+        while value is not None:
+            auto_record = Move_Record(self, None, value)
+            self.play_moves[value[0]](self, auto_record, value[1], None)
+            reward += self.reward
+            auto_moves.append(auto_record)
+            value = self.auto_move()
+        if auto_moves: record.auto_moves = auto_moves
+        self.reward = reward
 
     def get_header(self):
         """
         Retrieves the header of the data file of a Solitaire game
         """
-        header = []
-        for color in COLORS:
-            for rank in CARDS:
-                header.append(str(rank)+color)
-        for action in list(self.action_index_name.values()):
-            header.append(action)
-        header.append('reward')
-        return header
+        return list(HEADER)
 
+    # Moves of each opcode, saving in the record what their undoing needs
+    def play_draw(self, record, args, reveal):
+        self.draw()
 
-    def play(self, action):
+    def play_deck_to_heap(self, record, args, reveal):
+        record.deck_index = self.deck_index(args[1])
+        self.deck_to_heap(args[0], args[1])
+
+    def play_deck_to_column(self, record, args, reveal):
+        record.deck_index = self.deck_index(args[1])
+        self.deck_to_column(args[0], args[1])
+
+    def play_column_to_heap(self, record, args, reveal):
+        record.revealed = self.column_to_heap(args[0], args[1], reveal)
+
+    def play_heap_to_column(self, record, args, reveal):
+        self.heap_to_column(args[0], args[1])
+
+    def play_column_to_column(self, record, args, reveal):
+        record.revealed = self.column_to_column(args[0], args[1], args[2], reveal)
+
+    # Method playing each opcode
+    play_moves = (play_draw, play_deck_to_heap, play_deck_to_column, play_column_to_heap,
+                  play_heap_to_column, play_column_to_column)
+
+    def play(self, action, reveal=None):
         """
         Plays an action
         :param action: (int) key of the action to play
+        :param reveal: ((int, string)) rank and color of the card to reveal, random if None
+        :return: (Move_Record) the information needed to undo the action
         """
         value = self.actions_dict[action]
-        name = value[0]
-        args = value[1]
-        if name == ACTIONS[0]:
-            self.draw()
-        elif name == ACTIONS[1]:
-            self.deck_to_heap(args[0], args[1])
-        elif name == ACTIONS[2]:
-            self.deck_to_column(args[0], args[1])
-        elif name == ACTIONS[3]:
-            self.column_to_heap(args[0], args[1])
-        elif name == ACTIONS[4]:
-            self.heap_to_column(args[0], args[1])
-        else:
-            self.column_to_column(args[0], args[1], args[2])
+        record = Move_Record(self, action, value)
+        self.play_moves[value[0]](self, record, value[1], reveal)
+        if self.auto_heap: self.play_auto_moves(record)
         self.legal_actions()
 
         # Score updates
         self.score += self.reward
         self.time += 1
         # Stack update
-        if name != ACTIONS[0]:
-            _, state = self.get_state()
-            self.states_stack.append(state)
+        if value[0] != DRAW or record.auto_moves:
+            self.states_stack.append(self.hash)
+            if self.hash not in self.states_set:
+                self.states_set.add(self.hash)
+                record.new_state = True
+
+        return record
+
+    # Undoing of each opcode
+    def undo_draw(self, record, args):
+        pass
+
+    def undo_deck_move(self, card, index):
+        """
+        Puts back in the sub-deck a card moved from it
+        :param card: (Card) the moved card
+        :param index: (int) index of the card in the sub-deck
+        """
+        self.sub_deck.insert(index, card)
+        while index < len(self.sub_deck):
+            card = self.sub_deck[index]
+            self.set_card_state(card, self.state_dict[IN_DECK + str(index)])
+            index += 1
+
+    def undo_deck_to_heap(self, record, args):
+        self.undo_deck_move(self.heaps[args[0]].remove_card(), record.deck_index)
+
+    def undo_deck_to_column(self, record, args):
+        self.undo_deck_move(self.columns[args[0]].remove_cards(1)[0], record.deck_index)
+
+    def undo_column_to_heap(self, record, args):
+        if record.revealed is not None: self.hide(args[0])
+        card = self.heaps[args[1]].remove_card()
+        self.columns[args[0]].add_cards([card])
+        self.set_card_state(card, self.state_dict[IN_COL + str(args[0])])
+
+    def undo_heap_to_column(self, record, args):
+        card = self.columns[args[1]].remove_cards(1)[0]
+        self.heaps[args[0]].add_card(card)
+        self.set_card_state(card, self.state_dict[IN_HEAP])
+
+    def undo_column_to_column(self, record, args):
+        if record.revealed is not None: self.hide(args[0])
+        cards = self.columns[args[1]].remove_cards(args[2])
+        self.columns[args[0]].add_cards(cards)
+        for card in cards:
+            self.set_card_state(card, self.state_dict[IN_COL + str(args[0])])
+
+    # Method undoing each opcode
+    undo_moves = (undo_draw, undo_deck_to_heap, undo_deck_to_column, undo_column_to_heap,
+                  undo_heap_to_column, undo_column_to_column)
+
+    def undo(self, record):
+        """
+        Undoes the last played action
+        :param record: (Move_Record) record returned when the action was played
+        """
+        opcode, args = record.value
+        if opcode != DRAW or record.auto_moves:
+            self.states_stack.pop()
+            if record.new_state: self.states_set.remove(self.hash)
+        for auto_record in reversed(record.auto_moves):
+            self.undo_moves[auto_record.value[0]](self, auto_record, auto_record.value[1])
+            self.sub_deck_index = auto_record.sub_deck_index
+        self.undo_moves[opcode](self, record, args)
+
+        self.sub_deck_index = record.sub_deck_index
+        self.actions_dict = record.actions_dict
+        self.reward = record.reward
+        self.score = record.score
+        self.time = record.time
 
     def chance_action(self, action):
         """
-        Checks if an action involves randomness.
+        Checks if an action involves randomness, i.e. if it reveals a face-down card of a column.
         :param action: The action to perform
         """
-        game = copy.deepcopy(self)
-        cards_before = len(game.main_deck.cards)
-        game.play(action)
-        cards_after = len(game.main_deck.cards)
-        if cards_after >= cards_before: return False
-        return True
+        opcode, args = self.actions_dict[action]
+        if opcode == COL_HEAP: col, nb_cards = args[0], 1
+        elif opcode == COL_COL: col, nb_cards = args[0], args[2]
+        else: return False
+
+        column = self.columns[col]
+        return len(column.cards) == nb_cards and column.nb_todraw > 0
 
     def get_state(self):
         """
@@ -475,6 +798,13 @@ class Solitaire_Engine:
                     state.append(self.state_dict[UNDRAWN])
         return state, ''.join(str(x) for x in state)
 
+    def position_key(self):
+        """
+        Retrieves a key of the position: card locations, drawn cards and face-down cards.
+        """
+        return (self.hash, tuple(self.sub_deck_index),
+                tuple(column.nb_todraw for column in self.columns))
+
     def render(self):
         """
         Renders game in the console
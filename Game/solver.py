@@ -0,0 +1,209 @@
+from __future__ import division
+import heapq
+import time
+from Game.compact_engine import *
+
+# Order in which the solver tries the actions of each opcode, higher first
+OPCODE_PRIORITIES = {DECK_HEAP: 4, COL_HEAP: 5, DECK_COL: 1, COL_COL: 2, HEAP_COL: 0}
+# Priority added to the actions revealing a face-down card
+REVEAL_PRIORITY = 3
+
+
+def build_targets():
+    """
+    Builds the table of the cards each card can be put on in a column
+    :return: for each card code, the codes of the cards of the other color and of the next rank,
+             empty for kings
+    """
+    targets = []
+    for code in range(NB_CARDS):
+        rank = code_rank(code)
+        colors = BLACK_COLORS if code_red(code) else RED_COLORS
+        targets.append([color * NB_RANKS + rank for color in colors] if rank != KING else [])
+    return targets
+
+
+TARGETS = build_targets()
+
+
+def known_deal(seed):
+    """
+    Deals a game whose face-down cards are known, taken in the order of the seeded deck
+    :param seed: (int) seed of the deal
+    :return: the Compact_Engine dealt with the seed and, for each column, the rank and color of
+             its face-down cards in the order they are revealed
+    """
+    main_deck, sub_deck, tops = deal_cards(new_rng(seed))
+    cards = [main_deck.draw() for i in range(len(main_deck.cards))]
+    assignment = []
+    for col in range(NB_COLUMNS):
+        assignment.append([(card.rank, card.color) for card in cards[:col]])
+        cards = cards[col:]
+    return Compact_Engine(seed=seed), assignment
+
+
+def reveal_key(game, assignment, action):
+    """
+    Retrieves the card an action reveals in a game whose face-down cards are known
+    :param game: (Compact_Engine) the game
+    :param assignment: (list (list ((int, string)))) for each column, the rank and color of its
+                       face-down cards in the order they are revealed
+    :param action: (int) the action to play
+    :return: the rank and color of the revealed card, None if the action reveals no card
+    """
+    if not game.chance_action(action): return None
+    col = game.actions_dict[action][1][0]
+    cards = assignment[col]
+    return cards[len(cards) - game.buffer[COL_DOWN + col]]
+
+
+class Solver:
+    """
+    Class searching best-first for a win of a game whose face-down cards are known. The states
+    met before the search are the only banned ones, so that the actions of a position do not
+    depend on the path to it and each position is searched once: a win repeating no state can
+    always be found, the part of a path between two equal states being useless. Once a card left
+    the sub-deck or was revealed, none of these states can come back, and the solver also skips
+    the moves of a whole column to an empty column, which only swap two columns, and plays alone
+    the moves to the heaps no card could ever be put on. No win is lost by these cuts, so a
+    search exhausted within its budget proves the deal lost. Many deals are neither won nor
+    proven lost within a few seconds, so that only about 1200 deals per hour are decided with a
+    budget of 2 s per deal (see Benchmark/solver.py).
+    """
+
+    def __init__(self, game, assignment, max_nodes=None, time_limit=None):
+        """
+        Creates a new Solver object
+        :param game: (Solitaire_Engine or Compact_Engine) the game to solve, left unchanged
+        :param assignment: (list (list ((int, string)))) for each column, the rank and color of its
+                           face-down cards in the order they are revealed
+        :param max_nodes: (int) maximum number of positions searched, unbounded if None
+        :param time_limit: (float) maximum duration of the search in seconds, unbounded if None
+        """
+        self.game = game if isinstance(game, Compact_Engine) else Compact_Engine(game)
+        self.assignment = assignment
+        # Codes of the face-down cards of each column, from the bottom of the column
+        self.hidden = [[COLORS.index(color) * NB_RANKS + rank - 1 for rank, color in reversed(cards)]
+                       for cards in assignment]
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        # Number of positions searched and duration in seconds of the last search
+        self.nb_nodes = 0
+        self.solve_time = 0.0
+        # Winning actions found by the last search
+        self.solution = None
+
+    def blocked(self, game, col):
+        """
+        Checks if a card of a column can never leave it, the previous card of its color and the
+        cards it could be put on lying face down under it. Only the face-down cards and the
+        lowest face-up card are checked, the other face-up cards can be carried away on it.
+        :param game: (Compact_Engine) the game
+        :param col: (int) index of the column
+        """
+        buffer = game.buffer
+        cards = self.hidden[col][:buffer[COL_DOWN + col]]
+        if buffer[COL_UP + col]: cards = cards + [game.column_card(col, buffer[COL_UP + col] - 1)]
+        below = set()
+        for card in cards:
+            rank = code_rank(card)
+            # Aces can always reach a heap and kings an empty column
+            if ACE < rank < KING and card - 1 in below and below.issuperset(TARGETS[card]): return True
+            below.add(card)
+        return False
+
+    def ordered_actions(self, game, cuts):
+        """
+        Retrieves the actions worth trying from a position, the most promising last. With the cuts,
+        a safe card of a column is moved alone to its heap and whole columns are never moved to an
+        empty column, which only swaps them. Safe cards of the sub-deck are not moved alone, taking
+        one changes the cards the next draws give.
+        :param game: (Compact_Engine) the game
+        :param cuts: (bool) whether the actions are cut
+        :return: (list (int)) the actions
+        """
+        buffer = game.buffer
+        scored = []
+        for action, (opcode, args) in game.actions_dict.items():
+            if cuts:
+                if opcode == COL_HEAP and game.safe_to_heap(buffer[COL_TOP + args[0]]): return [action]
+                if opcode == COL_COL and buffer[COL_UP + args[0]] == args[2] and \
+                        not buffer[COL_DOWN + args[0]] and buffer[COL_TOP + args[1]] == NO_CARD:
+                    continue
+            priority = OPCODE_PRIORITIES[opcode]
+            if game.chance_action(action): priority += REVEAL_PRIORITY
+            scored.append((priority, action))
+        scored.sort()
+        return [action for priority, action in scored]
+
+    def progress(self, game):
+        """
+        Rates how far a position is from a win, positions with less face-down cards then less cards
+        out of the heaps being searched first
+        :param game: (Compact_Engine) the game
+        :return: (tuple (int)) the number of face-down cards and of cards out of the heaps
+        """
+        buffer = game.buffer
+        return sum(buffer[COL_DOWN:COL_DOWN + NB_COLUMNS]), NB_CARDS - buffer[LOC:LOC + NB_CARDS].count(IN_HEAP_VALUE)
+
+    def solve(self):
+        """
+        Searches for a winning sequence of actions, the most advanced positions first
+        :return: True if a win is found, False if the deal is proven lost and None if the search
+                 is stopped by its budget
+        """
+        start = time.perf_counter()
+        root = self.game
+        self.nb_nodes = 0
+        self.solution = None
+        result = None
+        if root.is_won():
+            result, self.solution = True, []
+        elif any(self.blocked(root, col) for col in range(NB_COLUMNS)):
+            result = False
+        else:
+            # States met before the search, shared by all its games: the state each action adds
+            # is removed at once
+            history = set(root.seen_states)
+            origin = root.buffer[DECK_LEN], self.progress(root)[0]
+            visited = {root.position_key()}
+            # Positions to search with their actions from the root as nested (action, parent) pairs,
+            # the last pushed position being searched first among equally advanced ones
+            queue = [(self.progress(root), 0, root, None)]
+            nb_pushed = 0
+            while queue and result is None:
+                if self.max_nodes is not None and self.nb_nodes >= self.max_nodes: break
+                if self.time_limit is not None and time.perf_counter() - start >= self.time_limit: break
+                position, order, game, path = heapq.heappop(queue)
+                self.nb_nodes += 1
+                # The actions of a position are only computed once it is searched, the met states
+                # being the same for all the positions
+                if game is not root: game.legal_actions()
+                # The cuts are only proven once the states met before the search cannot come back
+                cuts = (game.buffer[DECK_LEN], position[0]) != origin
+                for action in self.ordered_actions(game, cuts):
+                    child = game.clone()
+                    child.seen_states, child.owns_states = history, True
+                    reveal = reveal_key(child, self.assignment, action)
+                    record = child.play(action, reveal, False)
+                    if record.new_state: history.remove(child.hash)
+                    if child.is_won():
+                        result, path = True, (action, path)
+                        break
+                    # Only a revealed card can block its column
+                    if reveal is not None and self.blocked(child, game.actions_dict[action][1][0]): continue
+                    key = child.position_key()
+                    if key not in visited:
+                        visited.add(key)
+                        nb_pushed += 1
+                        heapq.heappush(queue, (self.progress(child), -nb_pushed, child, (action, path)))
+            if not queue and result is None: result = False
+
+            if result:
+                self.solution = []
+                while path is not None:
+                    action, path = path
+                    self.solution.append(action)
+                self.solution.reverse()
+        self.solve_time = time.perf_counter() - start
+        return result
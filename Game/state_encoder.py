@@ -0,0 +1,142 @@
+from __future__ import division
+import numpy as np
+from Game.compact_engine import *
+
+# Planes of the encoding of a game, each plane holding one value per card: one plane per
+# location value (columns, heaps, face-down cards, slots of the sub-deck), then the playable
+# cards on top of the columns and heaps, the top drawn card and the cards reachable by drawing
+NB_LOCATIONS = DECK_VALUE + NB_CARDS_SUBDECK
+COLUMN_TOP_PLANE = NB_LOCATIONS
+HEAP_TOP_PLANE = COLUMN_TOP_PLANE + 1
+WASTE_TOP_PLANE = HEAP_TOP_PLANE + 1
+REACHABLE_PLANE = WASTE_TOP_PLANE + 1
+NB_PLANES = REACHABLE_PLANE + 1
+NB_ACTION_NAMES = len(ACTION_NAMES)
+
+CARD_CODES = np.arange(NB_CARDS)
+CARD_RANKS = CARD_CODES % NB_RANKS
+# Location value of each column, to compare with the locations of the cards
+COLUMN_VALUES = np.arange(NB_COLUMNS)[:, None]
+
+
+def build_cycle_table():
+    """
+    Builds the array of the draw cycles of the sub-deck
+    :return: for each number of cards and index of the top drawn card (shifted by one), the
+             index of the top drawn card after each number of draws, -1 past the end of the cycle
+    """
+    table = np.full((NB_CARDS_SUBDECK + 1, NB_CARDS_SUBDECK + 1, NB_CARDS_SUBDECK + 1), -1)
+    for nb_cards in range(NB_CARDS_SUBDECK + 1):
+        for top, cycle in enumerate(DRAW_CYCLES[nb_cards]):
+            table[nb_cards, top, :len(cycle)] = cycle
+    return table
+
+
+CYCLE_TABLE = build_cycle_table()
+
+
+def solitaire_buffers(games):
+    """
+    Builds the state buffers of Solitaire_Engine games at once from the locations of their
+    cards, the other fields being derived from them with NumPy instead of packing the cards
+    one by one
+    :param games: (list (Solitaire_Engine)) the games
+    :return: (np.array) the state buffers, one row per game
+    """
+    nb_games = len(games)
+    locations = np.frombuffer(b''.join(game.locations for game in games), dtype=np.uint8)
+    locations = locations.reshape(nb_games, NB_CARDS)
+    # Drawn cards, face-down cards and heap tops of each game
+    fields = bytes([value for game in games for value in
+                    [game.sub_deck_index[0] if game.sub_deck_index else 0, len(game.sub_deck_index)] +
+                    [column.nb_todraw for column in game.columns] +
+                    [card_index(heap.cards[-1]) if heap.cards else NO_CARD for heap in game.heaps]])
+    fields = np.frombuffer(fields, dtype=np.uint8).reshape(nb_games, -1)
+    buffers = np.empty((nb_games, BUFFER_SIZE), dtype=np.uint8)
+    buffers[:, LOC:LOC + NB_CARDS] = locations
+
+    # Cards of the sub-deck, in the order of their slots
+    buffers[:, DECK:DECK_LEN] = NO_CARD
+    in_deck = locations >= DECK_VALUE
+    rows, cards = np.nonzero(in_deck)
+    buffers[rows, DECK + locations[rows, cards] - DECK_VALUE] = cards
+    buffers[:, DECK_LEN] = in_deck.sum(axis=1)
+    buffers[:, WASTE_START:COL_DOWN] = fields[:, :2]
+
+    # Face-up cards of the columns, the top one having the lowest rank
+    buffers[:, COL_DOWN:COL_UP] = fields[:, 2:2 + NB_COLUMNS]
+    in_column = locations[:, None, :] == COLUMN_VALUES
+    buffers[:, COL_UP:COL_TOP] = in_column.sum(axis=2)
+    tops = np.where(in_column, CARD_RANKS, NB_RANKS).argmin(axis=2)
+    buffers[:, COL_TOP:HEAP_TOP] = np.where(in_column.any(axis=2), tops, NO_CARD)
+    buffers[:, HEAP_TOP:BUFFER_SIZE] = fields[:, 2 + NB_COLUMNS:]
+    return buffers
+
+
+def game_buffers(games):
+    """
+    Retrieves the state buffers of games
+    :param games: (list (Solitaire_Engine or Compact_Engine)) the games
+    :return: (np.array) the buffers, one row per game
+    """
+    compact = [i for i in range(len(games)) if isinstance(games[i], Compact_Engine)]
+    if len(compact) == len(games):
+        buffers = np.frombuffer(b''.join(game.buffer for game in games), dtype=np.uint8)
+        return buffers.reshape(len(games), BUFFER_SIZE)
+    if not compact: return solitaire_buffers(games)
+
+    buffers = np.empty((len(games), BUFFER_SIZE), dtype=np.uint8)
+    compact_set = set(compact)
+    others = [i for i in range(len(games)) if i not in compact_set]
+    buffers[compact] = game_buffers([games[i] for i in compact])
+    buffers[others] = solitaire_buffers([games[i] for i in others])
+    return buffers
+
+
+def encode_buffers(buffers):
+    """
+    Encodes state buffers as planes
+    :param buffers: (np.array) state buffers, one row per game
+    :return: (np.array) planes of shape (number of games, NB_PLANES, NB_CARDS)
+    """
+    nb_games = len(buffers)
+    rows = np.arange(nb_games)
+    planes = np.zeros((nb_games, NB_PLANES, NB_CARDS), dtype=np.float32)
+    planes[rows[:, None], buffers[:, LOC:LOC + NB_CARDS], CARD_CODES] = 1
+
+    # Cards on top of the columns and heaps
+    for start, size, plane in [(COL_TOP, NB_COLUMNS, COLUMN_TOP_PLANE), (HEAP_TOP, NB_HEAPS, HEAP_TOP_PLANE)]:
+        tops = buffers[:, start:start + size]
+        games, slots = np.nonzero(tops != NO_CARD)
+        planes[games, plane, tops[games, slots]] = 1
+
+    # Drawn card and cards reachable by drawing
+    deck_len = buffers[:, DECK_LEN].astype(int)
+    waste_len = buffers[:, WASTE_LEN].astype(int)
+    tops = np.where(waste_len > 0, buffers[:, WASTE_START].astype(int) + waste_len - 1, -1)
+    drawn = np.nonzero(tops >= 0)[0]
+    planes[drawn, WASTE_TOP_PLANE, buffers[drawn, DECK + tops[drawn]]] = 1
+    indexes = CYCLE_TABLE[deck_len, tops + 1]
+    games, draws = np.nonzero(indexes >= 0)
+    planes[games, REACHABLE_PLANE, buffers[games, DECK + indexes[games, draws]]] = 1
+    return planes
+
+
+def encode(games):
+    """
+    Encodes games as NumPy arrays for the evaluation of a neural network
+    :param games: (list (Solitaire_Engine or Compact_Engine)) the games
+    :return: the planes of shape (number of games, NB_PLANES, NB_CARDS), the number of face-down
+             cards of each column of shape (number of games, NB_COLUMNS) and the mask of the legal
+             actions over the action names, of shape (number of games, NB_ACTION_NAMES)
+    """
+    buffers = game_buffers(games)
+    planes = encode_buffers(buffers)
+    hidden = buffers[:, COL_DOWN:COL_DOWN + NB_COLUMNS].astype(np.float32)
+
+    # Keys of the actions without a name, reached after many draws, are left out as in the samples
+    keys = [[key for key in game.actions_dict if key < NB_ACTION_NAMES] for game in games]
+    masks = np.zeros((len(games), NB_ACTION_NAMES), dtype=bool)
+    masks[np.repeat(np.arange(len(games)), [len(k) for k in keys]),
+          np.fromiter((key for k in keys for key in k), dtype=int)] = True
+    return planes, hidden, masks
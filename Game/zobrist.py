@@ -0,0 +1,32 @@
+import random as rd
+from Game.card import *
+
+# Number of cards and of location values of a card in the state of a game
+NB_ZOBRIST_CARDS = len(COLORS) * len(CARDS)
+NB_ZOBRIST_VALUES = 33
+# Seed of the table, fixed so that hashes are the same in every process
+ZOBRIST_SEED = 2718281828
+
+
+def build_zobrist_table(seed):
+    """
+    Builds a table of random 64-bit keys, one for each location of each card
+    :param seed: (int) seed of the random generator
+    """
+    generator = rd.Random(seed)
+    return [[generator.getrandbits(64) for value in range(NB_ZOBRIST_VALUES)]
+            for card in range(NB_ZOBRIST_CARDS)]
+
+
+ZOBRIST = build_zobrist_table(ZOBRIST_SEED)
+
+
+def zobrist_hash(state):
+    """
+    Computes the hash of a state from scratch
+    :param state: (list (int)) location value of each card, as given by get_state
+    """
+    value = 0
+    for i in range(len(state)):
+        value ^= ZOBRIST[i][state[i]]
+    return value
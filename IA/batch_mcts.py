@@ -0,0 +1,36 @@
+from IA.mcts_stocha import *
+from Game.batch_engine import *
+
+
+class Batch_Mcts(Mcts_Stocha):
+    """
+    Class defining a MCTS whose playouts of each leaf are played all at once by a Batch_Engine
+    """
+
+    def __init__(self, game, nb_rollouts=64, c=0.1, d=10000, **options):
+        """
+        Creates a new Batch_Mcts object
+        :param game: (Game) the game to solve, whose safe moves to the heaps are not automatic
+        :param nb_rollouts: (int) number of playouts of each leaf
+        :param c: (float) first UCB constant
+        :param d: (float) second UCB constant
+        :param options: (dict) other parameters of Mcts_Stocha, the actions of the playouts being
+                        always drawn uniformly
+        """
+        # The playouts of the batches would not play the safe moves to the heaps, nor follow a policy
+        if game.auto_heap: raise ValueError("Batch_Mcts does not support games with auto_heap")
+        if options.get('rollout_policy') is not None:
+            raise ValueError("Batch_Mcts does not support rollout policies, its playouts are uniform")
+        Mcts_Stocha.__init__(self, game, c, d, **options)
+        self.nb_rollouts = nb_rollouts
+        # Generator of the batches, seeded by the generator of the search
+        self.batch_rng = np.random.default_rng(self.rng.getrandbits(64))
+
+    def playouts(self, game):
+        """
+        Performs the playouts of a MCTS iteration in a batch of games
+        :param game: (Game) game to play
+        :return: the list of rewards of the playouts
+        """
+        batch = Batch_Engine(game, self.nb_rollouts, self.batch_rng)
+        return list(batch.rollouts(GAMMA, FACTOR_THRESHOLD))
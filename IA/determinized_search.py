@@ -0,0 +1,90 @@
+from __future__ import division
+import numpy as np
+import time
+from Game.solver import *
+
+
+class Determinized_Search:
+    """
+    Class defining a search sampling full assignments of the face-down cards of a game and
+    solving each resulting deal with a Solver, the actions of the game being rated by the
+    proportion of the deals they win
+    """
+
+    def __init__(self, game, nb_determinizations=10, max_nodes=2000, seed=None):
+        """
+        Creates a new Determinized_Search object
+        :param game: (Solitaire_Engine or Compact_Engine) the game to solve
+        :param nb_determinizations: (int) number of sampled assignments of the face-down cards
+        :param max_nodes: (int) maximum number of positions searched for each action of each deal
+        :param seed: (int) seed of the sampled assignments, drawn from the global generator if None
+        """
+        self.game = game
+        self.nb_determinizations = nb_determinizations
+        self.max_nodes = max_nodes
+        self.rng = rd.Random(seed if seed is not None else rd.getrandbits(64))
+        # Number of positions searched since the creation of the search
+        self.nb_nodes = 0
+
+    def determinize(self, game):
+        """
+        Samples an assignment of the cards not seen yet to the face-down cards of the columns
+        :param game: (Compact_Engine) the game
+        :return: for each column, the rank and color of its face-down cards in the order they
+                 would be revealed
+        """
+        buffer = game.buffer
+        hidden = [i for i in range(NB_CARDS) if buffer[LOC + i] == UNDRAWN_VALUE]
+        self.rng.shuffle(hidden)
+        assignment = []
+        for col in range(NB_COLUMNS):
+            cards = hidden[:buffer[COL_DOWN + col]]
+            hidden = hidden[len(cards):]
+            assignment.append([(code_rank(card), COLORS[card // NB_RANKS]) for card in cards])
+        return assignment
+
+    def solve(self, game, assignment):
+        """
+        Solves a determinized game
+        :param game: (Compact_Engine) the game, left unchanged
+        :param assignment: (list (list ((int, string)))) face-down cards of each column
+        :return: (bool) whether a win was found within the node budget
+        """
+        solver = Solver(game, assignment, self.max_nodes)
+        won = solver.solve()
+        self.nb_nodes += solver.nb_nodes
+        return bool(won)
+
+    def win_rates(self, time_budget=None):
+        """
+        Solves sampled deals from each legal action of the game
+        :param time_budget: (float) maximum duration of the search in seconds, at least one deal
+                            being solved, unbounded if None
+        :return: the legal actions, the number of deals won by each of them and the number of deals
+        """
+        start = time.perf_counter()
+        root = self.game if isinstance(self.game, Compact_Engine) else Compact_Engine(self.game)
+        actions = list(root.actions_dict.keys())
+        wins = np.zeros(len(actions))
+        nb_deals = 0
+        while nb_deals < self.nb_determinizations:
+            if time_budget is not None and nb_deals and time.perf_counter() - start >= time_budget: break
+            assignment = self.determinize(root)
+            for i, action in enumerate(actions):
+                game = root.clone()
+                game.play(action, reveal_key(game, assignment, action))
+                if self.solve(game, assignment): wins[i] += 1
+            nb_deals += 1
+        return actions, wins, nb_deals
+
+    def search(self, time_budget=None):
+        """
+        Performs a determinized search
+        :param time_budget: (float) maximum duration of the search in seconds, unbounded if None
+        :return: the actions of the game and their probabilities, proportional to their win rates
+                 and uniform if no deal is won
+        """
+        actions, wins, nb_deals = self.win_rates(time_budget)
+        if not actions: return actions, wins
+        if wins.sum() == 0: return actions, np.full(len(actions), 1 / len(actions))
+        return actions, wins / wins.sum()
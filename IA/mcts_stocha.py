@@ -1,95 +1,220 @@
 from IA.node_stocha import *
+from IA.transposition_table import *
+from IA.policies import *
 import random as rd
 import math
 import copy
+import time
 
 GAMMA = 0.9
 FACTOR_THRESHOLD = 0.01
+# Minimum number of visits of each action of the root before the search can stop early
+MIN_DECISION_VISITS = 10
+
+
+def check_budgets(nb_trajectories, time_budget, node_budget):
+    """
+    Checks that a search is bounded, an early stop on confidence being never certain
+    :param nb_trajectories: (int) maximum number of simulations, unbounded if None
+    :param time_budget: (float) maximum duration of the search in seconds, unbounded if None
+    :param node_budget: (int) maximum number of nodes to create, unbounded if None
+    """
+    if nb_trajectories is None and time_budget is None and node_budget is None:
+        raise ValueError("A search needs a number of trajectories, a time budget or a node budget")
 
 class Mcts_Stocha:
     """
     Class defining a stochastic Monte Carlo Tree Search
     """
 
-    def __init__(self, game, c=0.1, d=10000):
+    def __init__(self, game, c=0.1, d=10000, in_place=True, transposition=False, max_nodes=100000,
+                 seed=None, rollout_policy=None, prior_policy=None):
         """
         Creates a new MCTS object for stochastic games
         :param game: (Game) the game to solve
         :param c: (float) first UCB constant
         :param d: (float) second UCB constant
+        :param in_place: (bool) walk the tree by playing and undoing actions on the game itself
+                         instead of storing a copy of the game in each node
+        :param transposition: (bool) share the nodes of identical positions through a transposition table
+        :param max_nodes: (int) maximum number of nodes kept in the transposition table
+        :param seed: (int) seed of the search, independent of the seed of the game and drawn
+                     from the global generator if None
+        :param rollout_policy: (Uniform_Policy) policy drawing the actions of the playouts, the
+                               actions being drawn uniformly if None
+        :param prior_policy: (Uniform_Policy) policy ordering the expansion of the actions of a
+                             node, the action of highest weight being expanded first, in a random
+                             order if None
         """
         self.root = Node_Stocha(game)
+        self.game = game
+        # Generator of the random choices of the search and of the cards it reveals
+        self.rng = rd.Random(seed if seed is not None else rd.getrandbits(64))
         self.c = c
         self.d = d
+        self.in_place = in_place
+        self.rollout_policy = rollout_policy
+        self.prior_policy = prior_policy
+        # Number of nodes created since the creation of the search
+        self.nb_nodes = 1
+        self.table = None
+        if transposition:
+            self.table = Transposition_Table(max_nodes)
+            self.table.set_root(self.root)
 
-    def compute_ucb(self, node, action):
+    def compute_ucb(self, node):
         """
-        Computes the UCB score of single-player games.
-        :param node: (Node_Stocha) node for which the score is required
-        :param action: (int) action for which the score is required
+        Computes the UCB scores of single-player games for all the legal actions of a node.
+        :param node: (Node_Stocha) node for which the scores are required
+        :return: (np.array) the score of each action, in the order of the legal actions
         """
-        reward, sqr_reward, total_visits = 0.0, 0.0, 0
-        nodes_list = node.children[action]
-        for child in nodes_list:
-            reward += child.total_reward
-            sqr_reward += child.total_sqr_reward
-            total_visits += child.n_visits
+        visits, reward, sqr_reward = node.stats
+        mean = reward / visits
+
+        return mean + \
+               self.c * np.sqrt(math.log2(node.n_visits) / visits) + \
+               np.sqrt((sqr_reward - visits * (mean ** 2) + self.d) / visits)
+
+    def ucb(self, parent_visits, edge):
+        """
+        Computes the UCB score of an action from its statistics
+        :param parent_visits: (int) number of visits of the node of the action
+        :param edge: (list) number of visits, total reward and total squared reward of the action
+        """
+        total_visits, reward, sqr_reward = edge
 
         return (reward / total_visits) + \
-               self.c * np.sqrt(np.log2(node.n_visits) / total_visits) + \
-               np.sqrt((sqr_reward - total_visits * ((reward/total_visits) ** 2) + self.d) / total_visits)
+               self.c * math.sqrt(math.log2(parent_visits) / total_visits) + \
+               math.sqrt((sqr_reward - total_visits * ((reward/total_visits) ** 2) + self.d) / total_visits)
 
-    def select(self, node, sampling_width):
+    def select(self, node, sampling_width, moves=None, path=None):
         """
         Performs selection step of a MCTS iteration
         :param node: (Node_Stocha) node at which selection is performed
         :param sampling_width: (int) sampling width of the MCTS
-        :return: A tuple (Node_Stocha, action) corresponding to the selection
+        :param moves: (list (Move_Record)) actions played on the game while walking down the tree
+        :param path: (list (Node_Stocha, action)) nodes visited while walking down the tree,
+                     with the action selected in each of them
+        :return: A tuple (Node_Stocha, action) corresponding to the selection, the action being
+                 None if the walk stops at a shared node that cannot be followed further
         """
-        next_action, next_child, index = -1, -1, -1
-        unsampled_actions = []
+        if path is None: path = []
+        while True:
+            if self.table is not None: self.table.touch(node)
 
-        # If at least one action has not been sampled yet, randomly select one of them
-        if len(node.children.keys()) < len(node.legal_actions):
-            for action in node.legal_actions:
-                if action not in node.children:
-                    unsampled_actions.append(action)
+            # If at least one action has not been sampled yet, randomly select one of them
+            if len(node.children) < len(node.legal_actions):
+                unsampled_actions = [action for action in node.legal_actions if action not in node.children]
+                if self.prior_policy is not None: unsampled_actions = self.prior_actions(node, unsampled_actions)
+                next_action = unsampled_actions[self.rng.randint(0, len(unsampled_actions)-1)]
+                return self.selected(node, next_action, path)
 
-            index = rd.randint(0, len(unsampled_actions)-1)
-            next_action = unsampled_actions[index]
+            # If terminal node, notice it
+            if not node.legal_actions: return (node, -1)
 
-            return node, next_action
+            # If all actions have been sampled, select the best one according to their score
+            next_action = node.legal_actions[int(np.argmax(self.compute_ucb(node)))]
 
-        max_ucb, cur_ucb = -math.inf, 0
-        # If terminal node, notice it
-        if not node.legal_actions: return (node, next_action)
+            # A shared node may have been created with a history allowing other actions
+            if self.table is not None and self.in_place and next_action not in self.game.actions_dict:
+                path.append((node, None))
+                return node, None
 
-        # If all actions have been sampled, select the best one according to their score
-        for action in node.legal_actions:
-            cur_ucb = self.compute_ucb(node, action)
-            if cur_ucb > max_ucb:
-                max_ucb = cur_ucb
-                next_action = action
+            # If a new outcome of the action can be sampled, performs a transition according to the action.
+            if node.can_sample(next_action, sampling_width):
+                return self.selected(node, next_action, path)
 
-        # If the sampling width for the action is reached, randomly select one of the children.
-        if len(node.children[next_action]) == node.max_children(next_action, sampling_width):
-            next_child = rd.randint(0, node.max_children(next_action, sampling_width)-1)
-            return self.select(node.children[next_action][next_child], sampling_width)
-        # If at least one more child can be created, performs a transition according to the action.
-        else:
-            return node, next_action
+            # Otherwise select one of the children, as often as their outcome was sampled.
+            child, reveal = node.sample_child(next_action, self.rng)
+            # A shared node may be met again on the path
+            if self.table is not None and any(child is visited for visited, _ in path):
+                path.append((node, None))
+                return node, None
+            path.append((node, next_action))
+            if self.in_place:
+                moves.append(self.game.play(next_action, reveal))
+                # With the history of the walk, the action of a shared node may move other cards
+                if self.table is not None and child.key != self.game.position_key():
+                    self.game.undo(moves.pop())
+                    path[-1] = (node, None)
+                    return node, None
+            node = child
 
-    def expand(self, node, action):
+    def prior_actions(self, node, actions):
+        """
+        Retrieves the actions of a node to expand first according to the prior policy
+        :param node: (Node_Stocha) the node
+        :param actions: (list (int)) actions of the node not sampled yet
+        :return: the actions of highest weight, all the actions if the game of the node has others
+        """
+        game = self.game if self.in_place else node.game
+        # A shared node may have been created with a history allowing other actions
+        if any(action not in game.actions_dict for action in actions): return actions
+        weights = self.prior_policy.weights(game, actions)
+        best = max(weights)
+        return [action for action, weight in zip(actions, weights) if weight == best]
+
+    def selected(self, node, action, path):
+        """
+        Ends the selection step at a node
+        :param node: (Node_Stocha) node at which selection ends
+        :param action: (int) action to expand
+        :param path: (list (Node_Stocha, action)) nodes visited while walking down the tree
+        :return: A tuple (Node_Stocha, action) corresponding to the selection
+        """
+        # A shared node may have been created with a history allowing other actions
+        if self.table is not None and self.in_place and action not in self.game.actions_dict:
+            action = None
+        path.append((node, action))
+        return node, action
+
+    def expand(self, node, action, moves=None):
         """
         Performs the expansion step of a MCTS iteration
         :param node: (Node_Stocha) node at which expansion is performed
         :param action: (int) action with which expansion is performed
-        :return: the child node created for expansion
+        :param moves: (list (Move_Record)) actions played on the game while walking down the tree
+        :return: the child node of the sampled outcome, created if the outcome is new
         """
-        game_copy = copy.deepcopy(node.game)
-        game_copy.play(action)
-        child = node.add_child(Node_Stocha(game_copy, node, action), action)
-        return child
+        if self.in_place:
+            game = self.game
+            move = game.play(action)
+            moves.append(move)
+        else:
+            game = self.copy_game(node.game)
+            move = game.play(action)
+        reveal = None
+        if move.revealed is not None: reveal = (move.revealed.rank, move.revealed.color)
+
+        # Outcomes revealing the same card share their child, the action of a shared node
+        # possibly reaching other positions with other histories
+        key = game.position_key() if self.table is not None else None
+        child = node.merge_outcome(action, reveal, key)
+        if child is not None: return child
+
+        if self.table is None:
+            self.nb_nodes += 1
+            return node.add_child(Node_Stocha(game, node, action), action, reveal)
+
+        # Positions already in the table share their node
+        child = self.table.get(key)
+        if child is None:
+            self.nb_nodes += 1
+            child = Node_Stocha(game, node, action)
+            self.table.put(child)
+        child.parents.append((node, action))
+        return node.add_child(child, action, reveal)
+
+    def copy_game(self, game):
+        """
+        Copies the game of a node, the cards revealed in the copy being drawn by the generator
+        of the search
+        :param game: (Game) game to copy
+        :return: the copy of the game
+        """
+        game = copy.deepcopy(game, {id(game.rng): self.rng})
+        game.rng = self.rng
+        return game
 
     def simulation(self, game):
         """
@@ -99,54 +224,225 @@ class Mcts_Stocha:
         """
         reward = 0
         time = 0
+        moves = []
         while not game.is_over() and GAMMA ** time > FACTOR_THRESHOLD:
-            actions = game.legal_actions()
-            next_action = rd.choice(actions)
-            game.play(next_action)
+            actions = list(game.actions_dict.keys())
+            if self.rollout_policy is None: next_action = self.rng.choice(actions)
+            else: next_action = self.rollout_policy.choose(game, actions, self.rng)
+            moves.append(game.play(next_action))
             reward += (GAMMA ** time) * game.get_reward()
             time += 1
 
+        if self.in_place: self.undo(moves)
+
         return reward
 
-    def backpropagate(self, node, reward):
+    def undo(self, moves):
+        """
+        Undoes the actions played on the game during a MCTS iteration
+        :param moves: (list (Move_Record)) actions played, in order
+        """
+        while moves:
+            self.game.undo(moves.pop())
+
+    def backpropagate(self, path, reward):
         """
         Performs backpropagation step of a MCTS iteration
-        :param node: (Node_Stocha) node at which backpropagation is performed
+        :param path: (list (Node_Stocha, action)) nodes visited by the iteration, with the action
+                     selected in each of them
         :param reward: (float) reward of the backpropagation
         """
+        for node, action in path:
+            node.update_node(reward)
+            if action is not None: node.update_edge(action, reward)
+
+    def advance_root(self, action, game):
+        """
+        Moves the root of the search tree to the position reached by a played action, keeping
+        the statistics already gathered for this position and freeing the rest of the tree
+        :param action: (int) the played action
+        :param game: (Game) the game once the action is played, with the card it revealed
+        :return: True if a subtree of the previous tree is reused, False otherwise
+        """
+        key = game.position_key()
+        new_root = None
+        for child in self.root.children.get(action, []):
+            if child.key == key:
+                new_root = child
+                break
+
+        # Without playing in place, the old root refers to the game that has been played since
+        if self.table is not None and not self.in_place and self.root is not new_root:
+            self.table.detach(self.root)
+
+        self.game = game
+        if new_root is None:
+            self.root = Node_Stocha(game)
+        else:
+            self.root = new_root
+            new_root.parent = None
+            new_root.game = game
+            # A shared node may have been created with another history
+            new_root.set_legal_actions(game)
+            for old_action in list(new_root.children.keys()):
+                if old_action not in game.actions_dict:
+                    new_root.remove_action(old_action)
+        if not self.in_place and self.table is None: return new_root is not None
+        nodes = self.subtree(self.root)
+
+        # In place, nodes refer to the game walked by the search
+        if self.in_place:
+            for node in nodes:
+                node.game = game
+        if self.table is not None:
+            kept = set(id(node) for node in nodes)
+            self.table = Transposition_Table(self.table.max_nodes)
+            # The root is set first, so that filling the table never evicts it
+            self.table.set_root(self.root)
+            for node in nodes:
+                node.parents = [(parent, a) for parent, a in node.parents if id(parent) in kept]
+                self.table.put(node)
 
-        node.update_node(reward)
-        if node.parent is not None: self.backpropagate(node.parent, reward)
+        return new_root is not None
 
-    def tree_search(self, nb_trajectories, sampling_width):
+    def subtree(self, root):
         """
-        Performs a MCTS
-        :param nb_trajectories: (int) number of simulations to perform in the MCTS
+        Retrieves all the nodes reachable from a node
+        :param root: (Node_Stocha) the first node
+        :return: the list of the reachable nodes, each one only once
+        """
+        nodes = [root]
+        seen = {id(root)}
+        index = 0
+        while index < len(nodes):
+            for children in nodes[index].children.values():
+                for child in children:
+                    if id(child) not in seen:
+                        seen.add(id(child))
+                        nodes.append(child)
+            index += 1
+        return nodes
+
+    def iterate(self, sampling_width):
+        """
+        Performs a MCTS iteration
         :param sampling_width: (int) sampling width of the MCTS
-        :return: the policy derived by the MCTS for the current game
+        :return: False if a terminal node was selected, True otherwise
+        """
+        # Cards revealed during the search are drawn by the generator of the search
+        rng, self.game.rng = self.game.rng, self.rng
+        moves = []
+        path = []
+        node, action = self.select(self.root, sampling_width, moves, path)
+        # Shared nodes are reached by replaying the card revealed on each edge of the path
+        if self.table is not None and self.in_place and node.key != self.game.position_key():
+            raise RuntimeError("The game does not match the position of the selected node")
+        if action != -1:
+            if action is not None:
+                node = self.expand(node, action, moves)
+                path.append((node, None))
+            if self.in_place: game = self.game
+            else: game = self.copy_game(node.game)
+            for reward in self.playouts(game):
+                self.backpropagate(path, reward)
+        self.undo(moves)
+        self.game.rng = rng
+        return action != -1
+
+    def playouts(self, game):
+        """
+        Performs the playouts of a MCTS iteration
+        :param game: (Game) game to play
+        :return: the list of rewards of the playouts
         """
+        return [self.simulation(game)]
+
+    def root_statistics(self):
+        """
+        Retrieves the statistics of the root of the search tree
+        :return: the number of visits of the root and the statistics of each of its actions
+        """
+        return self.root.n_visits, self.root.edges
+
+    def policy(self, parent_visits=None, edges=None):
+        """
+        Retrieves the policy derived from the statistics of the root
+        :param parent_visits: (int) number of visits of the root, taken from the tree if None
+        :param edges: (dict) statistics of each action of the root, taken from the tree if None
+        :return: the actions of the root and their probabilities
+        """
+        if edges is None: parent_visits, edges = self.root_statistics()
         policy_actions = []
-        policy_probabs = []
         ucb_scores = []
 
-        # Build search tree
-        for i in range(nb_trajectories):
-            node, action = self.select(self.root, sampling_width)
-            if action == -1: break
-            child = self.expand(node, action)
-            reward = self.simulation(copy.deepcopy(child.game))
-            self.backpropagate(child, reward)
-
-        # Retrieving of the policy
-        ucb_scores.clear()
         max_ucb = 0
         for action in self.root.legal_actions:
-            cur_ucb = self.compute_ucb(self.root, action)
+            cur_ucb = self.ucb(parent_visits, edges[action]) if action in edges else 0
             max_ucb += cur_ucb
+            policy_actions.append(action)
             ucb_scores.append(cur_ucb)
 
-        for i in range(len(self.root.legal_actions)):
-            policy_actions.append(self.root.legal_actions[i])
-            policy_probabs.append(ucb_scores[i] / max_ucb)
+        return policy_actions, np.array(ucb_scores) / max_ucb
 
-        return policy_actions, np.array(policy_probabs)
\ No newline at end of file
+    def is_decided(self, confidence, min_visits=MIN_DECISION_VISITS):
+        """
+        Checks if the action of the root with the best mean reward is ahead of all the others,
+        the reward of each action being known up to a number of standard errors
+        :param confidence: (float) number of standard errors of the mean rewards
+        :param min_visits: (int) minimum number of visits of each action
+        """
+        visits, reward, sqr_reward = self.root.stats
+        if len(visits) == 1: return True
+        if len(visits) == 0 or visits.min() < min_visits: return False
+
+        mean = reward / visits
+        error = confidence * np.sqrt(np.maximum(sqr_reward / visits - mean ** 2, 0) / visits)
+        best = np.argmax(mean)
+        upper = mean + error
+        upper[best] = -math.inf
+        return mean[best] - error[best] > upper.max()
+
+    def anytime_search(self, sampling_width, nb_trajectories=None, time_budget=None, node_budget=None,
+                       confidence=None, check_interval=10):
+        """
+        Performs a MCTS until a budget is spent, the current policy being available in between
+        :param sampling_width: (int) sampling width of the MCTS
+        :param nb_trajectories: (int) maximum number of simulations, unbounded if None
+        :param time_budget: (float) maximum duration of the search in seconds, unbounded if None
+        :param node_budget: (int) maximum number of nodes to create, unbounded if None
+        :param confidence: (float) stop as soon as the best action is ahead of the others by this
+                           number of standard errors, never if None
+        :param check_interval: (int) number of simulations between two checks of early stopping
+        :return: a generator giving the number of simulations performed after each of them
+        """
+        check_budgets(nb_trajectories, time_budget, node_budget)
+        start = time.perf_counter()
+        first_node = self.nb_nodes
+        nb = 0
+        while nb_trajectories is None or nb < nb_trajectories:
+            if not self.iterate(sampling_width): return
+            nb += 1
+            yield nb
+
+            if time_budget is not None and time.perf_counter() - start >= time_budget: return
+            if node_budget is not None and self.nb_nodes - first_node >= node_budget: return
+            if confidence is not None and nb % check_interval == 0 and self.is_decided(confidence): return
+
+    def tree_search(self, nb_trajectories, sampling_width, time_budget=None, node_budget=None,
+                    confidence=None):
+        """
+        Performs a MCTS
+        :param nb_trajectories: (int) number of simulations to perform in the MCTS, unbounded if None
+        :param sampling_width: (int) sampling width of the MCTS
+        :param time_budget: (float) maximum duration of the search in seconds, unbounded if None
+        :param node_budget: (int) maximum number of nodes to create, unbounded if None
+        :param confidence: (float) number of standard errors by which the best action must lead
+                           the others to stop early, never if None
+        :return: the policy derived by the MCTS for the current game
+        """
+        # Build search tree
+        for nb in self.anytime_search(sampling_width, nb_trajectories, time_budget, node_budget, confidence):
+            pass
+
+        # Retrieving of the policy
+        return self.policy()
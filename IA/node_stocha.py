@@ -1,11 +1,27 @@
 from __future__ import division
 import numpy as np
 
+# Rows of the statistics of the actions of a node
+VISITS = 0
+REWARD = 1
+SQR_REWARD = 2
+NB_EDGE_STATS = 3
+# Progressive widening of the chance actions: a new outcome of an action is sampled while the
+# number of samples drawn for it, counting the repeated outcomes merged into their child, is below
+# WIDENING_CONSTANT * (visits of the action) ** WIDENING_EXPONENT. Counting distinct outcomes instead
+# would sample again forever an action with less possible outcomes than this bound.
+WIDENING_CONSTANT = 1.0
+WIDENING_EXPONENT = 0.5
+
 class Node_Stocha:
     """
     Class defining a Node for a stochastic Monte Carlo Tree Search.
     """
 
+    __slots__ = ['parent', 'parents', 'children', 'counts', 'reveals', 'stats', 'game', 'n_visits',
+                 'total_reward', 'total_sqr_reward', 'action', 'legal_actions', 'action_indexes',
+                 'chance_actions', 'key']
+
     def __init__(self, game, parent=None, action=-1):
         """
         Creates a new Node_Stocha object
@@ -15,8 +31,17 @@ class Node_Stocha:
         """
         # Parent node
         self.parent = parent
-        # Children table
+        # Parent nodes and actions leading to the node, when nodes are shared between positions
+        self.parents = []
+        # Children table, with the number of times the outcome of each child was sampled and the
+        # hidden card it revealed, if any: a shared child reached by several edges is stored with
+        # the card of each edge
         self.children = dict()
+        self.counts = dict()
+        self.reveals = dict()
+        # Statistics of each legal action, in the order of the legal actions: number of visits,
+        # total reward and total squared reward
+        self.stats = np.zeros((NB_EDGE_STATS, 0))
         # Game interface
         self.game = game
         # Total number of visits
@@ -27,21 +52,112 @@ class Node_Stocha:
         self.total_sqr_reward = 0
         # Action leading from parent to the node
         self.action = action
-        # List of legal actions
-        self.legal_actions = game.legal_actions()
+        # List of legal actions, column of each of them in the statistics, and set of those
+        # revealing a hidden card
+        self.legal_actions = []
+        self.action_indexes = dict()
+        self.chance_actions = frozenset()
+        self.set_legal_actions(game)
+        # Key of the position of the game
+        self.key = game.position_key()
 
-    def add_child(self, child, action):
+    def set_legal_actions(self, game):
+        """
+        Sets the legal actions of the node from the position of a game
+        :param game: (Game) game in the position of the node
+        """
+        legal_actions = list(game.actions_dict.keys())
+        action_indexes = dict((action, i) for i, action in enumerate(legal_actions))
+        stats = np.zeros((NB_EDGE_STATS, len(legal_actions)))
+        # Statistics of the actions that remain legal are kept
+        for action, edge in self.edges.items():
+            if action in action_indexes: stats[:, action_indexes[action]] = edge
+        self.legal_actions = legal_actions
+        self.action_indexes = action_indexes
+        self.stats = stats
+        self.chance_actions = frozenset(action for action in legal_actions if game.chance_action(action))
+
+    @property
+    def edges(self):
+        """
+        Retrieves the statistics of each sampled action
+        :return: (dict) number of visits, total reward and total squared reward of each action
+        """
+        stats = self.stats
+        return dict((self.legal_actions[i], stats[:, i].tolist()) for i in np.flatnonzero(stats[VISITS]))
+
+    def add_child(self, child, action, reveal=None):
         """
         Adds a new child to the list of children of a given action
         :param child: (Node_Stocha) child to add
         :param action: (int) action that lead to the child
+        :param reveal: (tuple) hidden card revealed by the action, if any
         :return: the added child
         """
         if action not in self.children:
             self.children[action] = []
+            self.counts[action] = []
+            self.reveals[action] = []
         self.children[action].append(child)
+        self.counts[action].append(1)
+        self.reveals[action].append(reveal)
         return child
 
+    def merge_outcome(self, action, reveal, key=None):
+        """
+        Counts a sampled outcome of an action that is already a child
+        :param action: (int) the sampled action
+        :param reveal: (tuple) hidden card revealed by the action, if any
+        :param key: (tuple) key of the reached position, that the child must also have, not
+                    checked if None
+        :return: the child of the outcome, None if the outcome is new
+        """
+        reveals = self.reveals.get(action, ())
+        for i in range(len(reveals)):
+            if reveals[i] == reveal and (key is None or self.children[action][i].key == key):
+                self.counts[action][i] += 1
+                return self.children[action][i]
+        return None
+
+    def remove_child(self, child, action):
+        """
+        Removes a child of a given action
+        :param child: (Node_Stocha) child to remove
+        :param action: (int) action that lead to the child
+        """
+        children = self.children.get(action)
+        if children is None: return
+        kept = [i for i in range(len(children)) if children[i] is not child]
+        if kept:
+            counts, reveals = self.counts[action], self.reveals[action]
+            self.children[action] = [children[i] for i in kept]
+            self.counts[action] = [counts[i] for i in kept]
+            self.reveals[action] = [reveals[i] for i in kept]
+        else:
+            self.remove_action(action)
+
+    def remove_action(self, action):
+        """
+        Removes all the children of a given action
+        :param action: (int) the action
+        """
+        del self.children[action]
+        del self.counts[action]
+        del self.reveals[action]
+
+    def sample_child(self, action, rng):
+        """
+        Chooses a child of a given action with a probability proportional to the number of times
+        its outcome was sampled
+        :param action: (int) the action
+        :param rng: (random.Random) generator of the choice
+        :return: the chosen child and the hidden card its outcome reveals, if any
+        """
+        children = self.children[action]
+        if len(children) == 1: return children[0], self.reveals[action][0]
+        i = rng.choices(range(len(children)), self.counts[action])[0]
+        return children[i], self.reveals[action][i]
+
     def nb_children(self, action):
         """
         Retrieves the number of children of a given action
@@ -59,14 +175,30 @@ class Node_Stocha:
         self.total_sqr_reward += reward ** 2
         self.n_visits += 1
 
-    def max_children(self, action, sampling_width):
+    def update_edge(self, action, reward):
+        """
+        Updates the statistics of an action after a playout going through it
+        :param action: (int) the action
+        :param reward: (float) the reward of the playout
+        """
+        stats = self.stats
+        index = self.action_indexes[action]
+        stats[VISITS, index] += 1
+        stats[REWARD, index] += reward
+        stats[SQR_REWARD, index] += reward ** 2
+
+    def can_sample(self, action, sampling_width):
         """
-        Retrieves the maximum number of children for a given action and sampling width
-        :param action: (int) action for which the information is required
-        :param sampling_width: (int) sampling width of the MCTS
+        Checks if a new outcome of a given action should be sampled. Chance actions are widened
+        progressively, their number of samples growing with their number of visits, up to the
+        sampling width of distinct outcomes.
+        :param action: (int) the action
+        :param sampling_width: (int) sampling width of the MCTS, maximum number of children of the action
         """
-        if self.game.chance_action(action): return sampling_width
-        else: return 1
+        if action not in self.children: return True
+        if action not in self.chance_actions or len(self.children[action]) >= sampling_width: return False
+        visits = self.stats[VISITS, self.action_indexes[action]]
+        return sum(self.counts[action]) < WIDENING_CONSTANT * visits ** WIDENING_EXPONENT
 
     def depth(self):
         """
@@ -0,0 +1,157 @@
+from IA.mcts_stocha import *
+from multiprocessing import Pool, cpu_count
+
+
+def search_worker(task):
+    """
+    Runs a MCTS in a worker process
+    :param task: (tuple) game, number of trajectories, sampling width, seed, MCTS options and
+                 search budgets
+    :return: the number of visits of the root and the statistics of each of its actions
+    """
+    game, nb_trajectories, sampling_width, seed, options, budgets = task
+    mcts = Mcts_Stocha(game, seed=seed, **options)
+    for nb in mcts.anytime_search(sampling_width, nb_trajectories, **budgets):
+        pass
+    return mcts.root_statistics()
+
+
+def rollout_worker(task):
+    """
+    Runs playouts from a game in a worker process
+    :param task: (tuple) game, number of playouts, seed and policy of the playouts
+    :return: the list of rewards of the playouts
+    """
+    game, nb_rollouts, seed, rollout_policy = task
+    mcts = Mcts_Stocha(game, seed=seed, rollout_policy=rollout_policy)
+    # The game is a copy of the one of the leaf, whose cards are revealed by the search
+    game.rng = mcts.rng
+    return [mcts.simulation(game) for i in range(nb_rollouts)]
+
+
+class Leaf_Parallel_Mcts(Mcts_Stocha):
+    """
+    Class defining a MCTS whose playouts of each leaf are run in parallel by a pool of workers
+    """
+
+    def __init__(self, game, pool, nb_workers, nb_rollouts, c=0.1, d=10000, **options):
+        """
+        Creates a new Leaf_Parallel_Mcts object
+        :param game: (Game) the game to solve
+        :param pool: (Pool) pool of worker processes
+        :param nb_workers: (int) number of worker processes
+        :param nb_rollouts: (int) number of playouts of each leaf
+        :param c: (float) first UCB constant
+        :param d: (float) second UCB constant
+        """
+        Mcts_Stocha.__init__(self, game, c, d, **options)
+        self.pool = pool
+        self.nb_workers = nb_workers
+        self.nb_rollouts = nb_rollouts
+
+    def playouts(self, game):
+        """
+        Performs the playouts of a MCTS iteration in the worker processes
+        :param game: (Game) game to play
+        :return: the list of rewards of the playouts
+        """
+        nb_tasks = min(self.nb_workers, self.nb_rollouts)
+        tasks = []
+        for i in range(nb_tasks):
+            nb_rollouts = self.nb_rollouts // nb_tasks + (1 if i < self.nb_rollouts % nb_tasks else 0)
+            tasks.append((game, nb_rollouts, self.rng.getrandbits(32), self.rollout_policy))
+
+        rewards = []
+        for result in self.pool.map(rollout_worker, tasks):
+            rewards += result
+        return rewards
+
+
+class Parallel_Mcts:
+    """
+    Class defining a MCTS run by a long-lived pool of worker processes
+    """
+
+    def __init__(self, nb_workers=None, c=0.1, d=10000, seed=None, **options):
+        """
+        Creates a new Parallel_Mcts object and starts its workers
+        :param nb_workers: (int) number of worker processes, the number of cores if None
+        :param c: (float) first UCB constant
+        :param d: (float) second UCB constant
+        :param seed: (int) seed of the searches, drawn from the global generator if None
+        :param options: (dict) other parameters of the Mcts_Stocha objects
+        """
+        # Generator of the seeds of the workers
+        self.rng = rd.Random(seed if seed is not None else rd.getrandbits(64))
+        self.nb_workers = nb_workers if nb_workers is not None else cpu_count()
+        self.c = c
+        self.d = d
+        self.options = options
+        self.pool = Pool(self.nb_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Stops the worker processes
+        """
+        self.pool.close()
+        self.pool.join()
+
+    def tree_search(self, game, nb_trajectories, sampling_width, time_budget=None, node_budget=None,
+                    confidence=None):
+        """
+        Performs a root-parallel MCTS: each worker builds its own tree and the statistics
+        of the root actions are merged
+        :param game: (Game) the game to solve
+        :param nb_trajectories: (int) total number of simulations to perform, unbounded if None
+        :param sampling_width: (int) sampling width of the MCTS
+        :param time_budget: (float) maximum duration of the search of each worker in seconds
+        :param node_budget: (int) maximum number of nodes created by each worker
+        :param confidence: (float) number of standard errors by which the best action must lead
+                           the others for a worker to stop early, never if None
+        :return: the policy derived by the MCTS for the current game
+        """
+        check_budgets(nb_trajectories, time_budget, node_budget)
+        tasks = []
+        options = dict(self.options, c=self.c, d=self.d)
+        budgets = dict(time_budget=time_budget, node_budget=node_budget, confidence=confidence)
+        for i in range(self.nb_workers):
+            nb_worker_trajectories = None
+            if nb_trajectories is not None:
+                nb_worker_trajectories = nb_trajectories // self.nb_workers
+                if i < nb_trajectories % self.nb_workers: nb_worker_trajectories += 1
+            tasks.append((game, nb_worker_trajectories, sampling_width, self.rng.getrandbits(32), options, budgets))
+
+        # Merge of the statistics of the root actions
+        parent_visits = 0
+        edges = dict()
+        for visits, worker_edges in self.pool.map(search_worker, tasks):
+            parent_visits += visits
+            for action, edge in worker_edges.items():
+                if action not in edges: edges[action] = [0, 0.0, 0.0]
+                for i in range(len(edge)):
+                    edges[action][i] += edge[i]
+
+        mcts = Mcts_Stocha(game, self.c, self.d, **self.options)
+        return mcts.policy(parent_visits, edges)
+
+    def leaf_search(self, game, nb_trajectories, sampling_width, nb_rollouts=None, **budgets):
+        """
+        Performs a leaf-parallel MCTS: a single tree is built and the playouts of each leaf
+        are run by the workers
+        :param game: (Game) the game to solve
+        :param nb_trajectories: (int) number of leaves to expand
+        :param sampling_width: (int) sampling width of the MCTS
+        :param nb_rollouts: (int) number of playouts of each leaf, the number of workers if None
+        :param budgets: (dict) time, node and confidence budgets of Mcts_Stocha.tree_search
+        :return: the policy derived by the MCTS for the current game
+        """
+        if nb_rollouts is None: nb_rollouts = self.nb_workers
+        mcts = Leaf_Parallel_Mcts(game, self.pool, self.nb_workers, nb_rollouts,
+                                  self.c, self.d, seed=self.rng.getrandbits(32), **self.options)
+        return mcts.tree_search(nb_trajectories, sampling_width, **budgets)
@@ -0,0 +1,64 @@
+from Game.solitaire_engine import *
+
+# Weight of the actions of each opcode in the heuristic policy
+OPCODE_WEIGHTS = {DRAW: 1.0, DECK_HEAP: 8.0, DECK_COL: 2.0, COL_HEAP: 8.0, HEAP_COL: 0.1, COL_COL: 1.0}
+# Weight of the actions revealing a face-down card, unless their opcode weighs more
+REVEAL_WEIGHT = 6.0
+
+
+class Uniform_Policy:
+    """
+    Class defining a policy giving the same weight to all the actions of a game
+    """
+
+    def weights(self, game, actions):
+        """
+        Rates actions of a game
+        :param game: (Solitaire_Engine or Compact_Engine) the game
+        :param actions: (list (int)) legal actions of the game
+        :return: (list (float)) positive weight of each action
+        """
+        return [1.0] * len(actions)
+
+    def choose(self, game, actions, rng):
+        """
+        Draws an action of a game with a probability proportional to its weight
+        :param game: (Solitaire_Engine or Compact_Engine) the game
+        :param actions: (list (int)) legal actions of the game
+        :param rng: (random.Random) generator of the draw
+        :return: (int) the chosen action
+        """
+        return rng.choices(actions, self.weights(game, actions))[0]
+
+
+class Heuristic_Policy(Uniform_Policy):
+    """
+    Class defining a policy rating the actions of a game from their opcode and from the
+    cards they reveal, read from the game without playing them: moves to the heaps and reveals
+    of face-down cards are favored and moves back from the heaps avoided
+    """
+
+    def __init__(self, opcode_weights=None, reveal_weight=REVEAL_WEIGHT):
+        """
+        Creates a new Heuristic_Policy object
+        :param opcode_weights: (dict) weight of the actions of each opcode, OPCODE_WEIGHTS if None
+        :param reveal_weight: (float) weight of the actions revealing a face-down card
+        """
+        self.opcode_weights = dict(OPCODE_WEIGHTS if opcode_weights is None else opcode_weights)
+        self.reveal_weight = reveal_weight
+
+    def weights(self, game, actions):
+        """
+        Rates actions of a game
+        :param game: (Solitaire_Engine or Compact_Engine) the game
+        :param actions: (list (int)) legal actions of the game
+        :return: (list (float)) positive weight of each action
+        """
+        actions_dict = game.actions_dict
+        opcode_weights = self.opcode_weights
+        weights = []
+        for action in actions:
+            weight = opcode_weights[actions_dict[action][0]]
+            if weight < self.reveal_weight and game.chance_action(action): weight = self.reveal_weight
+            weights.append(weight)
+        return weights
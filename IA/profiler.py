@@ -0,0 +1,134 @@
+from __future__ import division
+import time
+
+# Timed methods of the searches and of the games, with the name of their phase
+SEARCH_PHASES = [('select', 'select'), ('expand', 'expand'), ('playouts', 'simulate'),
+                 ('backpropagate', 'backpropagate'), ('compute_ucb', 'ucb'), ('copy_game', 'cloning')]
+GAME_PHASES = [('legal_actions', 'move generation'), ('play', 'play'), ('undo', 'undo')]
+
+
+class Profiler:
+    """
+    Class counting and timing the phases of a MCTS. The methods of the classes of the search and
+    of its game are only replaced by timed ones while the profiler runs, so that searches pay
+    nothing when they are not profiled. Times are inclusive: the time of play includes the time
+    of the move generation it triggers.
+    """
+
+    def __init__(self, search):
+        """
+        Creates a new Profiler object
+        :param search: (Mcts_Stocha) the search to profile
+        """
+        self.search = search
+        # Number of calls and total duration of each phase
+        self.stats = dict()
+        for method, phase in SEARCH_PHASES + GAME_PHASES:
+            self.stats[phase] = [0, 0.0]
+        # Number of selections, sum and maximum of their depths
+        self.depths = [0, 0, 0]
+        self.elapsed = 0.0
+        self.start_time = None
+        self.patched = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def timed(self, method, phase):
+        """
+        Builds the timed version of a method
+        :param method: (function) the method
+        :param phase: (string) name of the phase of the method
+        :return: the function calling the method and recording its duration
+        """
+        stats = self.stats[phase]
+
+        def timed_method(*args, **kwargs):
+            start = time.perf_counter()
+            result = method(*args, **kwargs)
+            stats[1] += time.perf_counter() - start
+            stats[0] += 1
+            return result
+        return timed_method
+
+    def measured_select(self, select):
+        """
+        Builds a version of the select method recording the depth of each selection
+        :param select: (function) the timed select method
+        :return: the function calling the method and recording the length of the path
+        """
+        depths = self.depths
+
+        def measured(search, node, sampling_width, moves=None, path=None):
+            if path is None: path = []
+            result = select(search, node, sampling_width, moves, path)
+            depths[0] += 1
+            depths[1] += len(path)
+            depths[2] = max(depths[2], len(path))
+            return result
+        return measured
+
+    def patch(self, cls, phases):
+        """
+        Replaces methods of a class by timed ones
+        :param cls: (type) the class
+        :param phases: (list (string, string)) names of the methods with the name of their phase
+        """
+        for method, phase in phases:
+            if not hasattr(cls, method): continue
+            # Inherited methods are removed from the class when restored
+            self.patched.append((cls, method, cls.__dict__.get(method)))
+            timed = self.timed(getattr(cls, method), phase)
+            if method == 'select': timed = self.measured_select(timed)
+            setattr(cls, method, timed)
+
+    def start(self):
+        """
+        Starts profiling the search and its game
+        """
+        self.patch(type(self.search), SEARCH_PHASES)
+        self.patch(type(self.search.game), GAME_PHASES)
+        self.start_time = time.perf_counter()
+
+    def stop(self):
+        """
+        Stops profiling, the original methods being restored
+        """
+        self.elapsed += time.perf_counter() - self.start_time
+        while self.patched:
+            cls, method, original = self.patched.pop()
+            if original is None: delattr(cls, method)
+            else: setattr(cls, method, original)
+
+    def reset(self):
+        """
+        Clears the recorded statistics
+        """
+        for stats in self.stats.values():
+            stats[:] = [0, 0.0]
+        self.depths[:] = [0, 0, 0]
+        self.elapsed = 0.0
+
+    def summary(self):
+        """
+        Describes the recorded statistics and the size of the search tree
+        :return: the description, one line per phase
+        """
+        nb_nodes = len(self.search.subtree(self.search.root))
+        lines = ["tree: " + str(nb_nodes) + " nodes - " + str(self.search.root.n_visits) + " root visits"]
+        nb_selections, total_depth, max_depth = self.depths
+        if nb_selections:
+            lines.append("depth: mean " + str(round(total_depth / nb_selections, 2)) +
+                         " - max " + str(max_depth))
+        lines.append("time: " + str(round(self.elapsed * 1000, 1)) + " ms")
+        for method, phase in SEARCH_PHASES + GAME_PHASES:
+            nb_calls, duration = self.stats[phase]
+            if nb_calls == 0: continue
+            lines.append(phase + ": " + str(nb_calls) + " calls - " + str(round(duration * 1000, 1)) +
+                         " ms (" + str(round(100 * duration / max(self.elapsed, 1e-9), 1)) + "%) - " +
+                         str(round(duration * 1e6 / nb_calls, 1)) + " us/call")
+        return "\n".join(lines)
@@ -0,0 +1,115 @@
+from Game.solitaire_engine import *
+from IA.mcts_stocha import *
+from Dataset.shard_writer import *
+from multiprocessing import Pool, cpu_count
+
+# Offset between the seed of the deal of a game and the default seed of its searches
+SEARCH_SEED_OFFSET = 2 ** 32
+
+
+def build_sample(solitaire, actions, probas):
+    """
+    Builds the sample of a turn of a game
+    :param solitaire: (Solitaire_Engine) the game
+    :param actions: (list (int)) actions of the policy of the turn
+    :param probas: (list (float)) probability of each action
+    :return: the state of the game followed by the probability of every action index
+    """
+    full_proba = [0] * len(solitaire.action_index_name)
+    for action, proba in zip(actions, probas):
+        if action < len(full_proba): full_proba[action] = proba
+    state, _ = solitaire.get_state()
+    return state + full_proba
+
+
+def play_game(task):
+    """
+    Plays a game of self-play in a worker process, reusing the search tree from turn to turn
+    :param task: (tuple) identifier of the game, seeds of its deal and of its searches, number of
+                 trajectories, sampling width, time budget of each turn, maximum number of turns
+                 (None for no limit), whether the safe moves to the heaps are automatic and policies
+                 of the playouts and of the expansion of the searches
+    :return: the identifier of the game, its samples and its final score
+    """
+    game, deal_seed, search_seed, nb_trajectories, sampling_width, time_budget, max_turns, auto_heap, \
+        rollout_policy, prior_policy = task
+
+    solitaire = Solitaire_Engine(deal_seed, auto_heap=auto_heap)
+    mcts = Mcts_Stocha(solitaire, seed=search_seed, rollout_policy=rollout_policy, prior_policy=prior_policy)
+    samples = []
+    while not solitaire.is_over() and (max_turns is None or solitaire.time < max_turns):
+        nb = max(nb_trajectories - mcts.root.n_visits, 1)
+        actions, probas = mcts.tree_search(nb, sampling_width, time_budget)
+        samples.append(build_sample(solitaire, actions, probas))
+
+        action = mcts.rng.choices(actions, probas)[0]
+        solitaire.play(action)
+        mcts.advance_root(action, solitaire)
+
+    return game, samples, solitaire.score
+
+
+class Self_Play_Farm:
+    """
+    Class playing independent games of self-play in a pool of worker processes, the finished
+    games being written by a single Shard_Writer. Games already in the dataset are not played
+    again, so that an interrupted run can be resumed.
+    """
+
+    def __init__(self, directory, nb_workers=None, nb_trajectories=50, sampling_width=10,
+                 time_budget=None, max_turns=None, checkpoint=10, auto_heap=False, rollout_policy=None,
+                 prior_policy=None):
+        """
+        Creates a new Self_Play_Farm object
+        :param directory: (string) directory of the dataset
+        :param nb_workers: (int) number of worker processes, the number of cores if None
+        :param nb_trajectories: (int) number of trajectories of the search of each turn
+        :param sampling_width: (int) sampling width of the searches
+        :param time_budget: (float) maximum duration of the search of each turn in seconds
+        :param max_turns: (int) maximum number of turns of a game, None for no limit
+        :param checkpoint: (int) number of finished games after which the buffered samples are
+                           written, None to only write full shards
+        :param auto_heap: (bool) play the safe moves to the heaps automatically in the games
+        :param rollout_policy: (Uniform_Policy) policy drawing the actions of the playouts of the
+                               searches, uniform if None
+        :param prior_policy: (Uniform_Policy) policy ordering the expansion of the actions of the
+                             searches, uniform if None
+        """
+        self.directory = directory
+        self.nb_workers = nb_workers if nb_workers is not None else cpu_count()
+        self.nb_trajectories = nb_trajectories
+        self.sampling_width = sampling_width
+        self.time_budget = time_budget
+        self.max_turns = max_turns
+        self.checkpoint = checkpoint
+        self.auto_heap = auto_heap
+        self.rollout_policy = rollout_policy
+        self.prior_policy = prior_policy
+
+    def run(self, nb_games, seed=None, search_seed=None):
+        """
+        Plays the games of a run that are not in the dataset yet
+        :param nb_games: (int) number of games of the run
+        :param seed: (int) seed of the deals of the run, game i being dealt with seed + i, the seed
+                     recorded with the dataset if None, or a random one for a new dataset
+        :param search_seed: (int) seed of the searches of the run, the searches of game i being
+                            seeded with search_seed + i, seed + SEARCH_SEED_OFFSET if None
+        :return: the number of games played
+        """
+        # The seed is recorded with the dataset, so that a resumed run deals the same games
+        if seed is None: seed = read_seed(self.directory)
+        if seed is None: seed = rd.getrandbits(32)
+        if search_seed is None: search_seed = seed + SEARCH_SEED_OFFSET
+        done = written_games(self.directory)
+        tasks = [(game, seed + game, search_seed + game, self.nb_trajectories, self.sampling_width, self.time_budget,
+                  self.max_turns, self.auto_heap, self.rollout_policy, self.prior_policy)
+                 for game in range(nb_games) if game not in done]
+
+        nb_played = 0
+        with Shard_Writer(self.directory, Solitaire_Engine().get_header(), seed=seed) as writer:
+            with Pool(self.nb_workers) as pool:
+                for game, samples, score in pool.imap_unordered(play_game, tasks):
+                    writer.add_game(samples, score, game)
+                    nb_played += 1
+                    if self.checkpoint and nb_played % self.checkpoint == 0: writer.flush()
+        return nb_played
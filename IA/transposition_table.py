@@ -0,0 +1,78 @@
+from collections import OrderedDict
+
+class Transposition_Table:
+    """
+    Class defining a bounded table of search nodes indexed by the position of their game.
+    The least recently used nodes are evicted once the table is full.
+    """
+
+    def __init__(self, max_nodes):
+        """
+        Creates a new Transposition_Table object
+        :param max_nodes: (int) maximum number of nodes kept in the table
+        """
+        self.max_nodes = max_nodes
+        # Nodes by position key, from the least to the most recently used
+        self.nodes = OrderedDict()
+        # Node that is never evicted
+        self.root = None
+        # Number of evicted nodes
+        self.nb_evictions = 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def set_root(self, node):
+        """
+        Sets the node that must never be evicted
+        :param node: (Node_Stocha) root of the search
+        """
+        self.root = node
+        if node.key not in self.nodes: self.nodes[node.key] = node
+
+    def get(self, key):
+        """
+        Retrieves the node of a position, if any, and marks it as recently used
+        :param key: position key of the game
+        """
+        node = self.nodes.get(key)
+        if node is not None: self.nodes.move_to_end(key)
+        return node
+
+    def touch(self, node):
+        """
+        Marks a node as recently used
+        :param node: (Node_Stocha) the node
+        """
+        if node.key in self.nodes: self.nodes.move_to_end(node.key)
+
+    def put(self, node):
+        """
+        Adds a node to the table, evicting the least recently used ones if it is full. The root
+        and the added node, which the caller is about to link to the tree, are never evicted.
+        :param node: (Node_Stocha) node to add
+        """
+        self.nodes[node.key] = node
+        self.nodes.move_to_end(node.key)
+        for key in list(self.nodes):
+            if len(self.nodes) <= self.max_nodes: break
+            old = self.nodes[key]
+            if old is self.root or old is node: continue
+            del self.nodes[key]
+            self.detach(old)
+            self.nb_evictions += 1
+
+    def detach(self, node):
+        """
+        Removes all the links between a node and the rest of the graph
+        :param node: (Node_Stocha) the node to detach
+        """
+        for parent, action in node.parents:
+            parent.remove_child(node, action)
+        for action, children in node.children.items():
+            for child in children:
+                child.parents = [(parent, a) for parent, a in child.parents if parent is not node]
+        node.parents = []
+        node.children = dict()
+        node.counts = dict()
+        node.reveals = dict()
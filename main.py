@@ -1,17 +1,46 @@
 from __future__ import division
 from Game.solitaire_engine import *
 from IA.mcts_stocha import *
+from IA.parallel_mcts import *
+from Dataset.shard_writer import *
+from IA.self_play import *
+from IA.profiler import *
+from IA.determinized_search import *
 import threading
 import time
-import numpy as np
-import pandas as pd
-import os.path
-from multiprocessing import Process, Queue, Pipe
 
 NB_THREAD = 1
 NB_TRAJECTORIES = 50
 SAMPLING_WIDTH = 10
 NB_GAMES = 10
+# Keep the search tree from one turn to the next (only without worker processes)
+TREE_REUSE = True
+# Maximum duration of the search of a turn in seconds, None for no limit
+TIME_BUDGET = None
+# Rate the actions by solving sampled deals instead of building a MCTS, with the number of
+# sampled deals and the maximum number of positions searched for each action of a deal
+DETERMINIZED = False
+NB_DETERMINIZATIONS = 10
+SOLVER_NODES = 1000
+# Directory of the generated samples, and csv file where they are exported (None for no export).
+# The samples of successive runs are added to the same directory, and all of them are exported.
+DATA_DIRECTORY = "data"
+CSV_FILE = "data.csv"
+# Number of finished games after which their samples are written, so that a crash only loses the
+# games played since
+CHECKPOINT = 1
+# Print the cost of each phase of the search after each turn (only with TREE_REUSE, NB_THREAD = 1
+# and without DETERMINIZED, ignored with a warning otherwise)
+PROFILE = False
+# Policies drawing the actions of the playouts and ordering the expansion of the nodes of the
+# searches, e.g. Heuristic_Policy(), uniform if None
+ROLLOUT_POLICY = None
+PRIOR_POLICY = None
+# Play the safe moves to the heaps automatically, as part of the previous action
+AUTO_HEAP = False
+# Seed of the deal of the first game and seed of the searches, None for random games
+DEAL_SEED = None
+SEARCH_SEED = None
 
 class myThread (threading.Thread):
     def __init__(self, threadID, name, counter, solitaire):
@@ -26,86 +55,86 @@ class myThread (threading.Thread):
         mcts = Mcts_Stocha(self.solitaire)
         self.actions, self.probas = mcts.tree_search(NB_TRAJECTORIES, SAMPLING_WIDTH)
 
-def process_function(queue, solitaire):
-    mcts = Mcts_Stocha(solitaire)
-    actions, probas = mcts.tree_search(int(NB_TRAJECTORIES/NB_THREAD), SAMPLING_WIDTH)
-    queue.put([actions, probas])
-
-
-def write_csv(file, dataframe):
-    """
-    Write data collected from simulations into a csv file
-    :param file: (string) path of the file
-    :param dataframe: (Dataframe) collected data
-    """
-    print(dataframe)
-    dataframe.to_csv(file, sep=';')
-
 def agent():
     """
     Generate data for an AI to learn how to play solitaire
     """
-    data = []
-    for i in range(NB_GAMES):
-        solitaire = Solitaire_Engine()
-        samples = []
-        while not solitaire.is_over():
-            print("Game "+ str(i+1)+ " - Turn "+str(solitaire.time+1))
-
-            if len(solitaire.actions_dict):
-                processes = []
-                queues = []
-                elems = []
-                #solitaire.render()
-                #for i in solitaire.actions_dict:
-                #    print(solitaire.actions_dict[i])
-                for j in range(NB_THREAD):
-                    # Add threads to thread list
-                    #threads.append(myThread(1, "Thread-" + str(i), 1, copy.deepcopy(solitaire)))
-                    queues.append(Queue())
-                    processes.append(Process(target=process_function, args=(queues[j], copy.deepcopy(solitaire))))
-                    #threads[i].start()
-                    processes[j].start()
+    writer = Shard_Writer(DATA_DIRECTORY, Solitaire_Engine().get_header())
+    # Generator of the seeds of the searches and of the played actions
+    rng = rd.Random(SEARCH_SEED if SEARCH_SEED is not None else rd.getrandbits(64))
+    if PROFILE and (DETERMINIZED or not (TREE_REUSE and NB_THREAD == 1)):
+        print("Warning: PROFILE is ignored, the searches are only profiled with TREE_REUSE, NB_THREAD = 1 "
+              "and without DETERMINIZED")
+    # Worker processes are only started when the searches run in them
+    search = None
+    if not DETERMINIZED and not (TREE_REUSE and NB_THREAD == 1):
+        search = Parallel_Mcts(NB_THREAD, seed=rng.getrandbits(64), rollout_policy=ROLLOUT_POLICY,
+                               prior_policy=PRIOR_POLICY)
+    try:
+        for i in range(NB_GAMES):
+            solitaire = Solitaire_Engine(None if DEAL_SEED is None else DEAL_SEED + i, auto_heap=AUTO_HEAP)
+            samples = []
+            mcts = None
+            if TREE_REUSE and NB_THREAD == 1:
+                mcts = Mcts_Stocha(solitaire, seed=rng.getrandbits(32), rollout_policy=ROLLOUT_POLICY,
+                                   prior_policy=PRIOR_POLICY)
+            while not solitaire.is_over():
+                print("Game "+ str(i+1)+ " - Turn "+str(solitaire.time+1))
+
+                if len(solitaire.actions_dict):
+                    #solitaire.render()
+                    #for i in solitaire.actions_dict:
+                    #    print(solitaire.actions_dict[i])
+                    if DETERMINIZED:
+                        solver = Determinized_Search(solitaire, NB_DETERMINIZATIONS, SOLVER_NODES,
+                                                     rng.getrandbits(32))
+                        actions, probas = solver.search(TIME_BUDGET)
+                    elif mcts is not None:
+                        # Only the missing trajectories are run on a reused tree
+                        nb_trajectories = max(NB_TRAJECTORIES - mcts.root.n_visits, 1)
+                        if PROFILE:
+                            with Profiler(mcts) as profiler:
+                                actions, probas = mcts.tree_search(nb_trajectories, SAMPLING_WIDTH, TIME_BUDGET)
+                            print(profiler.summary())
+                        else:
+                            actions, probas = mcts.tree_search(nb_trajectories, SAMPLING_WIDTH, TIME_BUDGET)
+                    else:
+                        actions, probas = search.tree_search(solitaire, NB_TRAJECTORIES, SAMPLING_WIDTH, TIME_BUDGET)
+                else:
+                    actions = list(solitaire.actions_dict.keys())
+                    probas = [1]
 
-                # Wait for all threads to complete
-                for j in range(NB_THREAD):
-                    processes[j].join()
-                    elems.append(queues[j].get())
-                actions = elems[0][0]
-                probas = np.zeros(len(actions))
-                for j in range(NB_THREAD):
-                    probas += elems[j][1]
-                probas /= NB_THREAD
-            else:
-                actions = list(solitaire.actions_dict.keys())
-                probas = [1]
+                samples.append(build_sample(solitaire, actions, probas))
 
-            full_proba = []
-            for j in range(len(solitaire.action_index_name.keys())):
-                if j in actions:
-                    full_proba.append(probas[actions.index(j)])
+                action = rng.choices(actions, probas)[0]
+                if (int(action)) < len(solitaire.action_index_name):
+                    solitaire.chance_action(int(action))
+                    solitaire.play(int(action))
+                    if mcts is not None: mcts.advance_root(int(action), solitaire)
                 else:
-                    full_proba.append(0)
-            state, _ = solitaire.get_state()
-            samples.append(state + full_proba)
+                    print("Invalid Input !")
 
-            action = np.random.choice(actions, p=probas)
-            if (int(action)) < len(solitaire.action_index_name):
-                solitaire.chance_action(int(action))
-                solitaire.play(int(action))
-            else:
-                print("Invalid Input !")
+            if (solitaire.is_won()): print("Won !")
+            else: print("Lost")
 
-        if (solitaire.is_won()): print("Won !")
-        else: print("Lost")
+            writer.add_game(samples, solitaire.score)
+            if CHECKPOINT and (i + 1) % CHECKPOINT == 0: writer.flush()
+    finally:
+        if search is not None: search.close()
+        writer.close()
 
-        for j in range(len(samples)):
-            samples[j].append(solitaire.score)
-            data.append(samples[j])
+    if CSV_FILE is not None: export_csv(DATA_DIRECTORY, CSV_FILE)
 
-    solitaire = Solitaire_Engine()
-    data = pd.DataFrame(data, columns=solitaire.get_header())
-    write_csv("data.csv", data)
+def farm():
+    """
+    Generate data by playing whole games in parallel, resuming the games of an interrupted run
+    """
+    if PROFILE: print("Warning: PROFILE is ignored, the searches of the worker processes are not profiled")
+    games = Self_Play_Farm(DATA_DIRECTORY, NB_THREAD, NB_TRAJECTORIES, SAMPLING_WIDTH, TIME_BUDGET,
+                           auto_heap=AUTO_HEAP, rollout_policy=ROLLOUT_POLICY, prior_policy=PRIOR_POLICY)
+    print(str(games.run(NB_GAMES, DEAL_SEED, SEARCH_SEED)) + " games played")
+
+    if CSV_FILE is not None: export_csv(DATA_DIRECTORY, CSV_FILE)
 
 def human():
     """
@@ -113,10 +142,10 @@ def human():
     """
     solitaire = Solitaire_Engine()
     while not solitaire.is_over():
-        print(solitaire.states_stack)
         solitaire.render()
         for i in solitaire.actions_dict:
-            print(str(solitaire.actions_dict[i]) + " - " + str(i))
+            opcode, args = solitaire.actions_dict[i]
+            print(ACTIONS[opcode] + " " + str(list(args)) + " - " + str(i))
         action = input("Enter an action number: ")
         if (int(action)) < len(solitaire.action_index_name):
             start = time.time()